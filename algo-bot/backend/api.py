@@ -1,4 +1,5 @@
 # api.py
+import orjson
 import requests
 import time
 import threading
@@ -48,13 +49,14 @@ class MexcAPI:
         try:
             response = self.session.get(url, params=params)
             response.raise_for_status()
-            data = response.json()
+            # orjson parses the large numeric kline/ticker payloads much faster than stdlib json
+            data = orjson.loads(response.content)
             # Handle API errors that return 200 OK but have an error message in the body
             if isinstance(data, dict) and 'code' in data and data['code'] != 200:
                 logger.error(f"API error for {url}: {data.get('msg', 'Unknown')}")
                 raise ValueError(f"API error: {data.get('msg', 'Unknown')}")
             return data
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
             logger.error(f"Request failed for {url}: {e}")
             raise ValueError(f"Request failed: {e}")
 
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+
+import ccxt.pro as ccxtpro
+
+# Configure a specific logger for this module
+logger = logging.getLogger(__name__)
+
+MAX_BARS = 1000  # bars kept per (symbol, timeframe); also the REST backfill size
+INITIAL_FILL_TIMEOUT = 10  # seconds a first request waits for the backfill
+SUBSCRIPTION_IDLE_SECONDS = 15 * 60  # streams nobody has read for this long are stopped
+RECONNECT_DELAY = 5  # seconds
+
+StreamKey = Tuple[str, str]
+
+
+class MarketDataService:
+    """
+    Keeps recent OHLCV bars in memory, fed by ccxt.pro's watch_ohlcv WebSocket stream.
+    A stream is started lazily on the first request for a (symbol, timeframe), backfilled
+    once over REST, and stopped again after SUBSCRIPTION_IDLE_SECONDS without readers.
+    Public market data only, so a single unauthenticated client serves every user.
+    """
+    def __init__(self):
+        self.exchange = None
+        self.bars: Dict[StreamKey, Deque[list]] = {}
+        self._ready: Dict[StreamKey, asyncio.Event] = {}
+        self._errors: Dict[StreamKey, Exception] = {}
+        self._tasks: Dict[StreamKey, asyncio.Task] = {}
+        self._last_access: Dict[StreamKey, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def get_ohlcv(self, symbol: str, timeframe: str, limit: int) -> List[list]:
+        """Returns up to `limit` most recent bars, subscribing to the stream if needed."""
+        key = (symbol, timeframe)
+        self._last_access[key] = time.monotonic()
+        async with self._lock:
+            if key not in self._tasks:
+                self._start(key)
+            ready, bars = self._ready[key], self.bars[key]
+        await asyncio.wait_for(ready.wait(), timeout=INITIAL_FILL_TIMEOUT)
+        error = self._errors.get(key)
+        if error is not None:
+            raise error
+        return list(bars)[-limit:]
+
+    def _start(self, key: StreamKey):
+        if self.exchange is None:
+            self.exchange = ccxtpro.mexc({'enableRateLimit': True})
+        self.bars[key] = deque(maxlen=MAX_BARS)
+        self._ready[key] = asyncio.Event()
+        self._errors.pop(key, None)
+        self._tasks[key] = asyncio.create_task(self._run(key))
+
+    async def _stop(self, key: StreamKey):
+        """
+        Drops a stream's state and its exchange subscription; call with self._lock held.
+        Once no streams are left the client is closed, which ends every subscription.
+        """
+        self._tasks.pop(key, None)
+        self.bars.pop(key, None)
+        self._last_access.pop(key, None)
+        if self.exchange is None:
+            return
+        if not self._tasks:
+            await self.exchange.close()
+            self.exchange = None
+        elif self.exchange.has.get('unWatchOHLCV'):
+            try:
+                await self.exchange.un_watch_ohlcv(*key)
+            except Exception as e:
+                logger.warning("Could not unsubscribe OHLCV stream for %s %s: %s", *key, e)
+
+    async def _run(self, key: StreamKey):
+        symbol, timeframe = key
+        bars = self.bars[key]
+        try:
+            # Cold-start backfill over REST; the stream only delivers the latest bars
+            bars.extend(await self.exchange.fetch_ohlcv(symbol, timeframe, limit=MAX_BARS))
+        except Exception as e:
+            logger.error("Backfill failed for %s %s: %s", symbol, timeframe, e)
+            self._errors[key] = e
+            async with self._lock:
+                await self._stop(key)
+            self._ready[key].set()
+            return
+        self._ready[key].set()
+
+        while True:
+            if self._is_idle(key):
+                async with self._lock:
+                    # Re-check under the lock: a reader may have arrived meanwhile
+                    if self._is_idle(key):
+                        logger.info("Stopping idle OHLCV stream for %s %s", symbol, timeframe)
+                        await self._stop(key)
+                        return
+            try:
+                # Bounded wait, so a quiet market still gets its idle check
+                candles = await asyncio.wait_for(self.exchange.watch_ohlcv(symbol, timeframe), SUBSCRIPTION_IDLE_SECONDS)
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                continue
+            except Exception as e:
+                logger.warning("OHLCV stream error for %s %s: %s", symbol, timeframe, e)
+                await asyncio.sleep(RECONNECT_DELAY)
+                continue
+            for candle in candles:
+                if bars and candle[0] == bars[-1][0]:
+                    bars[-1] = candle  # the still-open bar was updated
+                elif not bars or candle[0] > bars[-1][0]:
+                    bars.append(candle)
+
+    def _is_idle(self, key: StreamKey) -> bool:
+        return time.monotonic() - self._last_access.get(key, 0) >= SUBSCRIPTION_IDLE_SECONDS
+
+    async def close(self):
+        """Cancels all streams and closes the exchange client; called on shutdown."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+        if self.exchange is not None:
+            await self.exchange.close()
+            self.exchange = None
+
+
+market_data_service = MarketDataService()
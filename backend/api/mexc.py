@@ -1,33 +1,88 @@
+import asyncio
+import hashlib
 import logging
+import random
+import ssl
 import time
+from collections import OrderedDict, defaultdict
+from typing import Optional, Tuple
+
+import aiohttp
+import certifi
 import ccxt.async_support as ccxt
 
+from api.single_flight import SingleFlight
+from config import TTL_SECONDS, BALANCE_CACHE_JITTER
+from disk_cache import load_json, dump_json
+
 # Configure a specific logger for this module
 logger = logging.getLogger(__name__)
 
-logging.basicConfig(level=logging.INFO)
+MARKETS_CACHE_FILE = "mexc_markets.json"
+
+# One HTTP session shared by every MexcAPI, so keep-alive connections to MEXC are
+# reused across pooled clients instead of each client opening its own pool.
+_shared_session: Optional[aiohttp.ClientSession] = None
+
+def _get_shared_session() -> Optional[aiohttp.ClientSession]:
+    """Returns the shared session, or None outside an event loop (ccxt then opens its own)."""
+    global _shared_session
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    if _shared_session is None or _shared_session.closed:
+        # Same TLS setup ccxt uses for the sessions it creates itself
+        connector = aiohttp.TCPConnector(
+            ssl=ssl.create_default_context(cafile=certifi.where()),
+            limit=200,
+            limit_per_host=50,
+            keepalive_timeout=60,
+            enable_cleanup_closed=True,
+        )
+        _shared_session = aiohttp.ClientSession(connector=connector)
+    return _shared_session
+
+async def close_shared_session():
+    global _shared_session
+    if _shared_session is not None and not _shared_session.closed:
+        await _shared_session.close()
+    _shared_session = None
+
 
 class MexcAPI:
     def __init__(self, api_key: str, secret: str):
         if not api_key or not secret:
-            logging.error("MexcAPI requires an api_key and secret to be provided.")
+            logger.error("MexcAPI requires an api_key and secret to be provided.")
             self.exchange = None
             return
         
         # The constructor itself should not be async.
         # We will use a factory method to create an initialized instance.
         logger.info("Attempting to initialize ccxt.mexc client...")
-        self.exchange = ccxt.mexc({
+        exchange_config = {
             'apiKey': api_key,
             'secret': secret,
             'options': {
                 'recvWindow': 10000  # Increased window for more tolerance
             },
             'adjustForTimeDifference': True, # Enable automatic time synchronization
-        })
+        }
+        session = _get_shared_session()
+        if session is not None:
+            # ccxt marks a passed-in session as not owned, so exchange.close() leaves it open
+            exchange_config['session'] = session
+        self.exchange = ccxt.mexc(exchange_config)
         self.balance_cache = None
         logger.info("ccxt.mexc client object created.")
         self.balance_cache_time = 0
+        self.balance_cache_ttl = TTL_SECONDS['balance']
+        self._free_balances = []
+        self._free_balances_source = None
+        self._symbols_by_quote = None
+        self._symbols_fetched_at = 0
+        # Concurrent cache misses share one in-flight exchange call per operation
+        self._flights = SingleFlight()
 
     async def fetch_spot_symbols(self, filter='USDT'):
         """
@@ -36,17 +91,48 @@ class MexcAPI:
         if not self.exchange:
             return []
         try:
-            markets = await self.exchange.load_markets()
-            symbols = [
-                s for s in markets
-                if markets[s]['spot']
-                and (not filter or markets[s]['quote'] == filter)
-            ]
-            return symbols
+            symbols_by_quote = await self._get_symbols_by_quote()
+            # An empty filter means every spot symbol, stored under the None key
+            return list(symbols_by_quote.get(filter or None, []))
         except ccxt.ExchangeError as e:
-            logger.error(f"Error fetching symbols: {e}", exc_info=True)
+            logger.error("Error fetching symbols: %s", e)
             return []
 
+    async def _get_symbols_by_quote(self):
+        """
+        Returns spot symbols grouped by quote currency, rebuilt from the markets at most
+        once per TTL_SECONDS['markets'] so every filter value is a dict lookup.
+        """
+        if self._symbols_by_quote is not None and time.time() - self._symbols_fetched_at < TTL_SECONDS['markets']:
+            return self._symbols_by_quote
+        return await self._flights.do('symbols_by_quote', self._build_symbols_by_quote)
+
+    async def _build_symbols_by_quote(self):
+        markets = await self._load_markets()
+        symbols_by_quote = defaultdict(list)
+        for symbol, market in markets.items():
+            if market['spot']:
+                symbols_by_quote[market['quote']].append(symbol)
+                symbols_by_quote[None].append(symbol)
+        self._symbols_by_quote = dict(symbols_by_quote)
+        self._symbols_fetched_at = time.time()
+        return self._symbols_by_quote
+
+    async def _load_markets(self):
+        """
+        Returns the exchange markets, using the in-memory copy, then the on-disk
+        cache, and only then the REST endpoint.
+        """
+        if self.exchange.markets:
+            return self.exchange.markets
+        markets = load_json(MARKETS_CACHE_FILE, TTL_SECONDS['markets'])
+        if markets:
+            # set_markets rebuilds markets_by_id / symbols just like load_markets does
+            return self.exchange.set_markets(markets)
+        markets = await self._flights.do('load_markets', self.exchange.load_markets)
+        dump_json(MARKETS_CACHE_FILE, markets)
+        return markets
+
     async def place_order(self, symbol, side, type, amount, price=None):
         """
         Places an order.
@@ -56,31 +142,58 @@ class MexcAPI:
         try:
             return await self.exchange.create_order(symbol, type, side, amount, price)
         except ccxt.ExchangeError as e:
-            logger.error(f"Error placing order: {e}", exc_info=True)
+            logger.error("Error placing order: %s", e)
             return None
 
     async def fetch_balances(self):
         """
         Fetches the account balance, with caching.
         """
-        cache_duration = 10  # seconds
-        current_time = time.time()
-
-        if self.balance_cache and (current_time - self.balance_cache_time) < cache_duration:
+        if self.balance_cache and (time.time() - self.balance_cache_time) < self.balance_cache_ttl:
             return self.balance_cache
 
         if not self.exchange:
             return {}
+        return await self._flights.do('fetch_balance', self._refresh_balances)
+
+    async def _refresh_balances(self):
         try:
             logger.info("Attempting to fetch balances from MEXC...")
             self.balance_cache = await self.exchange.fetch_balance()
-            self.balance_cache_time = current_time
+            self.balance_cache_time = time.time()
+            # Jitter the TTL so clients refreshed together don't all expire together
+            self.balance_cache_ttl = TTL_SECONDS['balance'] + random.uniform(-BALANCE_CACHE_JITTER, BALANCE_CACHE_JITTER)
             logger.info("Successfully fetched balances from MEXC.")
             return self.balance_cache
         except ccxt.ExchangeError as e:
-            logger.error(f"Error fetching balance from MEXC: {e}", exc_info=True)
+            logger.error("Error fetching balance from MEXC: %s", e)
             return {}
 
+    async def fetch_free_balances(self):
+        """
+        Returns [{'asset', 'free'}] for assets with a positive free balance.
+        Parsed once per balance cache refresh rather than on every call.
+        """
+        balances = await self.fetch_balances()
+        if balances is not self._free_balances_source:
+            self._free_balances = self._parse_free_balances(balances)
+            self._free_balances_source = balances
+        return self._free_balances
+
+    @staticmethod
+    def _parse_free_balances(balances):
+        # ccxt normalizes free amounts into balances['free'] as {asset: float}
+        free = balances.get('free')
+        if free:
+            return [{'asset': asset, 'free': amount} for asset, amount in free.items() if amount and amount > 0]
+        # Fall back to the raw exchange payload if ccxt did not normalize it
+        parsed = []
+        for item in balances.get('info', {}).get('balances', []):
+            free_balance = float(item.get('free', 0))
+            if free_balance > 0:
+                parsed.append({'asset': item['asset'], 'free': free_balance})
+        return parsed
+
     async def get_available_balance(self, asset='USDT'):
         """
         Gets the available balance for a specific asset.
@@ -94,3 +207,72 @@ class MexcAPI:
         """
         balances = await self.fetch_balances()
         return balances.get(asset, {}).get('total', 0)
+
+
+# --- Client pool ---
+# Authenticated routes reuse one MexcAPI per API key pair instead of building a new
+# ccxt client (and aiohttp session, TLS handshake and markets) on every request.
+CLIENT_POOL_TTL = 10 * 60  # seconds
+CLIENT_POOL_MAX_SIZE = 100
+CLIENT_CLOSE_GRACE = 30  # seconds an evicted client stays open for in-flight requests
+
+_client_pool: "OrderedDict[str, Tuple[MexcAPI, float]]" = OrderedDict()
+_client_pool_lock = asyncio.Lock()
+_retired_clients = {}  # close task -> client
+
+def _pool_key(api_key: str, secret: str) -> str:
+    # Hash the credentials so raw secrets are not kept around as dict keys
+    return hashlib.sha256(f"{api_key}:{secret}".encode()).hexdigest()
+
+async def _close_later(client: MexcAPI, delay: float):
+    await asyncio.sleep(delay)
+    try:
+        await client.exchange.close()
+    except Exception as e:
+        logger.warning("Error closing evicted MEXC client: %s", e)
+
+def _retire(client: MexcAPI):
+    task = asyncio.create_task(_close_later(client, CLIENT_CLOSE_GRACE))
+    _retired_clients[task] = client
+    task.add_done_callback(lambda t: _retired_clients.pop(t, None))
+
+async def get_pooled_client(api_key: str, secret: str) -> MexcAPI:
+    """
+    Returns a cached MexcAPI for the key pair, creating one if it is missing or older
+    than CLIENT_POOL_TTL. Least recently used clients are evicted past CLIENT_POOL_MAX_SIZE.
+    """
+    key = _pool_key(api_key, secret)
+    async with _client_pool_lock:
+        now = time.monotonic()
+        entry = _client_pool.get(key)
+        if entry and now - entry[1] < CLIENT_POOL_TTL:
+            _client_pool.move_to_end(key)
+            return entry[0]
+        if entry:
+            _retire(_client_pool.pop(key)[0])
+
+        client = MexcAPI(api_key=api_key, secret=secret)
+        if not client.exchange:
+            return client
+        _client_pool[key] = (client, now)
+        while len(_client_pool) > CLIENT_POOL_MAX_SIZE:
+            _, (evicted, _) = _client_pool.popitem(last=False)
+            _retire(evicted)
+        return client
+
+async def close_client_pool():
+    """Closes every pooled and retired client; called on application shutdown."""
+    async with _client_pool_lock:
+        clients = [client for client, _ in _client_pool.values()]
+        _client_pool.clear()
+    # Close retired clients now rather than waiting out their grace period
+    for task, client in list(_retired_clients.items()):
+        task.cancel()
+        clients.append(client)
+    _retired_clients.clear()
+    for client in clients:
+        try:
+            await client.exchange.close()
+        except Exception as e:
+            logger.warning("Error closing MEXC client: %s", e)
+    await close_shared_session()
@@ -1,14 +1,23 @@
-from fastapi import APIRouter, HTTPException, Depends, status, Request
+from fastapi import APIRouter, HTTPException, Depends, Query, status, Request, Response
 from fastapi.concurrency import run_in_threadpool
-from sqlalchemy.orm import Session
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
 
+import asyncio
+import functools
+import hashlib
 import logging
+from types import MappingProxyType
+
+import ccxt
+import orjson
 # Assuming you have these utility functions and strategy classes
 # These imports are hypothetical and should be adjusted to your project structure.
 # from strategies.main_runner import run_all_strategies
-from strategies.utils.sentiment_tracker import get_daily_sentiment_trend, fetch_top_coins
-from api.mexc import MexcAPI
-from db.database import SessionLocal
+from strategies.utils.sentiment_tracker import get_daily_sentiment_trend_async, get_daily_sentiment_trends_async, fetch_top_coins
+from api.mexc import MexcAPI, get_pooled_client
+from api.market_data import MAX_BARS, market_data_service
+from db.database import AsyncSessionLocal
 from strategies.short_term import ShortTermStrategy
 
 # Configure logging
@@ -16,16 +25,26 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Failures expected on a flaky network or under exchange rate limiting
+# (ccxt.DDoSProtection and RequestTimeout are NetworkError subclasses).
+TRANSIENT_ERRORS = (ccxt.NetworkError, asyncio.TimeoutError)
+
+def _log_failure(message: str, *args, error: Exception):
+    """
+    Logs a handler failure. Transient errors get a one-line warning; a traceback is
+    only formatted for unexpected exceptions, since doing so blocks the event loop.
+    """
+    if isinstance(error, TRANSIENT_ERRORS):
+        logger.warning(message, *args, error)
+    else:
+        logger.error(message, *args, error, exc_info=True)
+
 # --- Placeholder for DB dependency ---
 # In a real app, you would have a dependency injection system for your database.
-def get_db():
-    """Dependency to get a DB session for each request."""
-    try:
-        db = SessionLocal()
+async def get_db():
+    """Dependency to get an async DB session for each request."""
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        if db:
-            db.close()
 
 async def get_exchange_client(request: Request):
     """Dependency to get an authenticated MEXC API client from request headers."""
@@ -35,24 +54,33 @@ async def get_exchange_client(request: Request):
     if not api_key or not api_secret:
         raise HTTPException(status_code=400, detail="X-Exchange-Api-Key and X-Exchange-Api-Secret headers are required.")
 
-    mexc_client = None
     try:
-        # The creation of the client object itself is synchronous, but we do it
-        # inside the async function. The network calls will be async.
-        logger.info("get_exchange_client: Creating MexcAPI client...")
-        mexc_client = MexcAPI(api_key=api_key, secret=api_secret)
+        # Clients are pooled per key pair (see api.mexc.get_pooled_client), so the
+        # ccxt session and loaded markets are reused across requests.
+        mexc_client = await get_pooled_client(api_key, api_secret)
         if not mexc_client.exchange:
             logger.error("get_exchange_client: MexcAPI client initialization failed (no exchange object).")
             raise HTTPException(status_code=401, detail="Authentication failed: Could not initialize exchange client.")
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"get_exchange_client: Exception during MexcAPI creation: {e}", exc_info=True)
+        _log_failure("get_exchange_client: Exception during MexcAPI creation: %s", error=e)
         raise HTTPException(status_code=500, detail=f"Error creating MEXC client: {str(e)}")
 
-    try:
-        yield mexc_client
-    finally:
-        if mexc_client and mexc_client.exchange:
-            await mexc_client.exchange.close()
+    # Pooled clients are closed on eviction or application shutdown, not per request.
+    return mexc_client
+
+def _etag_response(request: Request, payload, max_age: int) -> Response:
+    """
+    Serializes the payload once, derives a strong ETag from the bytes, and answers
+    304 Not Modified when the client already holds that version.
+    """
+    body = orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    headers = {'ETag': etag, 'Cache-Control': f'max-age={max_age}'}
+    if request.headers.get('if-none-match') == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type='application/json', headers=headers)
 
 # In a real app, you would have a way to access active trades/signals
 # This is a simplified placeholder.
@@ -71,7 +99,7 @@ async def calibrate_bot_endpoint(mexc_client: MexcAPI = Depends(get_exchange_cli
         logger.info("calibrate_bot_endpoint: Calibration successful.")
         return {"status": "calibration_successful", "message": "API keys are valid."}
     except Exception as e:
-        logger.error(f"calibrate_bot_endpoint: Calibration failed during fetch_balances: {e}", exc_info=True)
+        _log_failure("calibrate_bot_endpoint: Calibration failed during fetch_balances: %s", error=e)
         raise HTTPException(status_code=401, detail=f"Authentication failed: {str(e)}")
 
 @router.get("/account/balance")
@@ -81,21 +109,14 @@ async def get_account_balance(mexc_client: MexcAPI = Depends(get_exchange_client
     """
     try:
         logger.info("get_account_balance: Fetching account balance...")
-        balance_data = await mexc_client.fetch_balances() # This is a ccxt object
-        
-        # The raw ccxt object is complex. We need to parse it into a simple list
-        # of assets with non-zero balances for the frontend.
-        parsed_balances = []
-        if 'info' in balance_data and 'balances' in balance_data['info']:
-            for item in balance_data['info']['balances']:
-                free_balance = float(item.get('free', 0))
-                if free_balance > 0:
-                    parsed_balances.append({'asset': item['asset'], 'free': free_balance})
+        # A simple list of assets with non-zero balances for the frontend,
+        # parsed by MexcAPI once per balance cache refresh.
+        parsed_balances = await mexc_client.fetch_free_balances()
         
-        logger.info(f"get_account_balance: Parsed and returning balances: {parsed_balances}")
+        logger.info("get_account_balance: Parsed and returning balances: %s", parsed_balances)
         return parsed_balances
     except Exception as e:
-        logger.error(f"get_account_balance: Failed to fetch balance: {e}", exc_info=True)
+        _log_failure("get_account_balance: Failed to fetch balance: %s", error=e)
         raise HTTPException(status_code=500, detail=f"Failed to fetch account balance: {str(e)}")
 
 @router.post("/run-strategies", status_code=status.HTTP_202_ACCEPTED)
@@ -104,48 +125,56 @@ async def run_strategies_endpoint():
     # run_all_strategies() # This would be a non-blocking call in a real app
     return {"status": "strategy_run_triggered"}
 
+@functools.lru_cache(maxsize=1)
+def _sl_tp_multipliers() -> MappingProxyType:
+    """
+    Read-only {side: (stop-loss, take-profit) multipliers} of a ShortTermStrategy at its
+    default success rate. Only these floats are shared between requests, never a
+    strategy instance whose setters (e.g. success_rate) could change them.
+    """
+    strategy = ShortTermStrategy(exchange=None, symbol=None, timeframe='5m')
+    return MappingProxyType({side: strategy.calculate_sl_tp(1.0, side) for side in ('buy', 'sell')})
+
 @router.post("/signals/{symbol}/details")
-def get_signal_details(symbol: str, entry_price: float, side: str):
+async def get_signal_details(symbol: str, entry_price: float, side: str):
     """
     For a given symbol and trade entry, calculates and returns the
     dynamically adjusted Take-Profit and Stop-Loss levels.
     """
-    # We'll use a strategy instance to access its calculation logic.
-    # In a real app, you might fetch the strategy associated with the trade.
-    strategy = ShortTermStrategy(exchange=None, symbol=symbol, timeframe='5m')
+    # ShortTermStrategy's levels scale linearly with the entry price, so the
+    # multipliers are computed once. In a real app, you might load the strategy's
+    # actual success rate from a DB and derive them from that instead.
+    multipliers = _sl_tp_multipliers().get(side)
 
-    # You might want to load the strategy's actual success rate from a DB
-    # strategy.success_rate = fetch_success_rate_from_db(strategy_name)
-
-    tp, sl = strategy.calculate_sl_tp(entry_price, side)
-
-    if tp is None:
+    if multipliers is None:
         raise HTTPException(status_code=400, detail="Invalid side provided.")
 
+    tp, sl = (entry_price * m for m in multipliers)
+
     return {"symbol": symbol, "take_profit": tp, "stop_loss": sl}
 
 @router.get("/ohlcv/{symbol:path}")
-async def get_ohlcv_data(symbol: str, timeframe: str = '1h', limit: int = 100, mexc_client: MexcAPI = Depends(get_exchange_client)): # type: ignore
+async def get_ohlcv_data(request: Request, symbol: str, timeframe: str = '1h', limit: int = Query(100, ge=1, le=MAX_BARS)):
     """
     Fetches historical OHLCV data for a given symbol.
     The `:path` in the route allows symbols like 'BTC/USDT' to be passed correctly.
+    Bars are served from the in-memory WebSocket-fed buffer in api.market_data.
     """
     try:
-        logger.info(f"get_ohlcv_data: Fetching OHLCV for {symbol}...")
-        # The ccxt library is async, so we need to use await here.
-        ohlcv = await mexc_client.exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit) # type: ignore
+        logger.info("get_ohlcv_data: Fetching OHLCV for %s...", symbol)
+        ohlcv = await market_data_service.get_ohlcv(symbol, timeframe, limit)
         # Log the first data point to confirm structure
-        logger.info(f"get_ohlcv_data: Successfully fetched {len(ohlcv)} OHLCV points. First point: {ohlcv[0] if ohlcv else 'N/A'}")
-        # The ohlcv data is already a list of lists, which is JSON serializable.
-        return ohlcv
-    except HTTPException:
-        raise # Re-raise HTTP exceptions from the dependency
+        logger.info("get_ohlcv_data: Successfully fetched %s OHLCV points. First point: %s", len(ohlcv), ohlcv[0] if ohlcv else 'N/A')
+        # The ohlcv data is already a list of lists of numbers; serialize it straight
+        # with orjson. The open bar updates continuously, so clients may only reuse
+        # a response briefly, but unchanged polls still get a bodiless 304.
+        return _etag_response(request, ohlcv, max_age=60)
     except Exception as e:
-        logger.error(f"get_ohlcv_data: Failed to fetch OHLCV for {symbol}: {e}", exc_info=True)
+        _log_failure("get_ohlcv_data: Failed to fetch OHLCV for %s: %s", symbol, error=e)
         raise HTTPException(status_code=500, detail=f"Failed to fetch OHLCV data: {str(e)}")
 
 @router.get("/sentiment")
-async def get_general_sentiment(request: Request, db: Session = Depends(get_db)):
+async def get_general_sentiment(request: Request, db: AsyncSession = Depends(get_db)):
     """
     Fetches general market sentiment.
     This fulfills the requirement from App.tsx's background fetch.
@@ -161,22 +190,25 @@ async def get_general_sentiment(request: Request, db: Session = Depends(get_db))
         # Fetch the top coins and then get their sentiment trends.
         # We run the synchronous sanpy calls in a threadpool to avoid blocking the server.
         top_symbols = await run_in_threadpool(fetch_top_coins, santiment_key) # type: ignore
-        trends = {}
-        # Limit to the top 10 for a quick overview to avoid long API calls
-        for symbol in top_symbols[:10]:
-            trend_data = await run_in_threadpool(get_daily_sentiment_trend, db, symbol) # type: ignore
-            if trend_data and 'live_24h' in trend_data:
-                trends[symbol] = trend_data['live_24h']
+        # Limit to the top 10 for a quick overview; all trends come from one DB query
+        top_symbols = top_symbols[:10]
+        trend_data = await get_daily_sentiment_trends_async(db, top_symbols)
+        trends = {
+            symbol: trend_data[symbol]['live_24h']
+            for symbol in top_symbols
+            if symbol in trend_data and 'live_24h' in trend_data[symbol]
+        }
         return {'top_sentiment': trends}
     except Exception as e:
-        logger.error(f"get_general_sentiment: An exception occurred: {e}", exc_info=True)
+        _log_failure("get_general_sentiment: An exception occurred: %s", error=e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/sentiment/{symbol}")
-async def get_symbol_sentiment(symbol: str, db: Session = Depends(get_db)):
+async def get_symbol_sentiment(request: Request, symbol: str, db: AsyncSession = Depends(get_db)):
     """Fetches detailed sentiment for a specific symbol."""
-    # Also run this synchronous DB call in the threadpool
-    trend = await run_in_threadpool(get_daily_sentiment_trend, db, symbol.upper()) # type: ignore
+    trend = await get_daily_sentiment_trend_async(db, symbol.upper())
     if not trend:
         raise HTTPException(status_code=404, detail=f"Sentiment data not found for symbol: {symbol}")
-    return trend
\ No newline at end of file
+    # Sentiment is stored daily, so an hour of client-side reuse is safe. The trend
+    # holds pandas Timestamps, which orjson rejects; encode them to ISO strings first.
+    return _etag_response(request, jsonable_encoder(trend), max_age=3600)
\ No newline at end of file
@@ -4,23 +4,36 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 from sqlalchemy.orm import Session
 from db.models import SocialMetric
+# One upsert implementation for both trackers
+from strategies.utils.sentiment_tracker import METRIC_COLUMNS, store_metrics
+from config import TTL_SECONDS
+from disk_cache import load_json, dump_json
 import logging
 
 # Configure a specific logger for this module
 logger = logging.getLogger(__name__)
 
 def fetch_top_coins(api_key: str, limit: int = 50) -> List[str]:
-    """Fetch top coins by market cap from Santiment more efficiently."""
+    """
+    Fetch top coins by market cap from Santiment more efficiently.
+    The ranking is cached on disk for TTL_SECONDS['top_symbols'], so repeated calls
+    within the hour skip the Santiment round trip.
+    """
     if not api_key:
         raise ValueError("Santiment API key is required.")
+    cache_name = f"santiment_top_coins_{limit}.json"
+    cached = load_json(cache_name, TTL_SECONDS['top_symbols'])
+    if cached:
+        return cached
     sanpy.ApiConfig.api_key = api_key
     # Fetching all projects is slow. A better way is to get top projects by a metric.
     logger.info(f"Attempting to fetch top {limit} coins from Santiment...")
     top_by_marketcap = sanpy.get(
         f"projects/top_by_metric/marketcap_usd?top={limit}"
     )
-    symbols = top_by_marketcap['slug'].str.upper().tolist()
-    return symbols[:limit]
+    symbols = top_by_marketcap['slug'].str.upper().tolist()[:limit]
+    dump_json(cache_name, symbols)
+    return symbols
 
 def fetch_sentiment_time_series(symbols: List[str], api_key: str, days_back: int = 7) -> Dict[str, pd.DataFrame]:
     """
@@ -62,34 +75,12 @@ def fetch_sentiment_time_series(symbols: List[str], api_key: str, days_back: int
             
     return results
 
-def store_metrics(db: Session, metrics_data: Dict[str, pd.DataFrame]):
-    """Upsert daily metrics to DB."""
-    for symbol, df in metrics_data.items():
-        for _, row in df.iterrows():
-            # Ensure row['date'] is a datetime.date object
-            metric_date = row['date']
-            if isinstance(metric_date, pd.Timestamp):
-                metric_date = metric_date.date()
-
-            existing = db.query(SocialMetric).filter_by(symbol=symbol, date=metric_date).first()
-            if not existing:
-                metric = SocialMetric(
-                    symbol=symbol,
-                    date=metric_date,
-                    mentions=row['mentions'],
-                    bullish_pct=row['bullish_pct'],
-                    bearish_pct=row['bearish_pct'],
-                    neutral_pct=row['neutral_pct'],
-                    net_sentiment=row['net_sentiment']
-                )
-                db.add(metric)
-    db.commit()
-
 def get_daily_sentiment_trend(db: Session, symbol: str, days_back: int = 7) -> Optional[Dict]:
     """Query DB for daily counters + live (latest). Returns avg sentiment, mention growth."""
     end_date = datetime.now().date()
     start_date = end_date - timedelta(days=days_back)
-    metrics = db.query(SocialMetric).filter( # type: ignore
+    # Plain column tuples rather than ORM objects, fed straight to from_records
+    metrics = db.query(*(getattr(SocialMetric, c) for c in METRIC_COLUMNS)).filter( # type: ignore
         SocialMetric.symbol == symbol,
         SocialMetric.date >= start_date
     ).all()
@@ -97,14 +88,7 @@ def get_daily_sentiment_trend(db: Session, symbol: str, days_back: int = 7) -> O
     if not metrics:
         return None
     
-    df = pd.DataFrame([{
-        'date': m.date,
-        'mentions': m.mentions,
-        'bullish_pct': m.bullish_pct,
-        'bearish_pct': m.bearish_pct,
-        'neutral_pct': m.neutral_pct,
-        'net_sentiment': m.net_sentiment
-    } for m in metrics])
+    df = pd.DataFrame.from_records(metrics, columns=METRIC_COLUMNS)
     
     # Daily counters: Sum/avg per day
     daily = df.groupby('date').agg({
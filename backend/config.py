@@ -7,6 +7,13 @@ SL_TP_PERCENT = 0.05  # 5%
 WIN_RATE_THRESHOLD = 0.95
 SYMBOLS_ENDPOINT = '/api/v3/exchangeInfo'
 SHORT_POLL = 60  # seconds
+# Cache lifetimes (seconds), matched to how often each kind of data actually changes
+TTL_SECONDS = {
+    'balance': 10,  # changes with every fill; kept short for order sizing
+    'markets': 86400,  # exchange markets / symbol lists change at most daily
+    'top_symbols': 3600,  # volume rankings drift slowly; reused across sampler runs
+}
+BALANCE_CACHE_JITTER = 1.0  # +/- seconds added to each balance cache lifetime
 FEE_RATE = 0.0005  # 0.05% taker default
 RISK_MAX_PERCENT = 0.05  # 5% of reserves
 SUCCESS_THRESHOLD = 0.90  # >90%
@@ -1,21 +1,124 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+import functools
+import logging
 import os
 
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
 # Define the path for the data directory and the SQLite database file
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
-os.makedirs(DATA_DIR, exist_ok=True)
 DATABASE_URL = f"sqlite:///{os.path.join(DATA_DIR, 'stockast.db')}"
+# Same database through the aiosqlite driver, for async request handlers
+ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{os.path.join(DATA_DIR, 'stockast.db')}"
+
+logger = logging.getLogger(__name__)
+
+# Engines are created on first use. create_engine does not open the database file, so
+# importing this module has no filesystem side effects; init_db() does the setup.
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    WAL lets readers proceed while a writer is active (writers still serialize, so keep
+    write batches short). NORMAL sync is durable under WAL except on power loss.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+    cursor.execute("PRAGMA cache_size=-65536")  # 64 MiB
+    cursor.close()
+
+@functools.lru_cache(maxsize=1)
+def get_engine():
+    engine = create_engine(
+        DATABASE_URL, connect_args={"check_same_thread": False}
+    )
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+@functools.lru_cache(maxsize=1)
+def get_async_engine():
+    engine = create_async_engine(ASYNC_DATABASE_URL)
+    event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return engine
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
+@functools.lru_cache(maxsize=1)
+def _sessionmaker():
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+
+@functools.lru_cache(maxsize=1)
+def _async_sessionmaker():
+    return async_sessionmaker(get_async_engine(), class_=AsyncSession, expire_on_commit=False)
+
+def SessionLocal() -> Session:
+    """New sync session; the engine and session factory are built on the first call."""
+    return _sessionmaker()()
+
+# Async sessions are used by the API routes so DB access doesn't occupy threadpool
+# workers. Scheduler jobs and scripts keep using the sync SessionLocal.
+def AsyncSessionLocal() -> AsyncSession:
+    """
+    New async session; the aiosqlite engine is built on the first call, so importing
+    this module needs neither aiosqlite nor greenlet.
+    """
+    return _async_sessionmaker()()
+
+# Unique keys declared on the models, which ON CONFLICT inserts such as store_metrics
+# depend on: (table, index name, columns)
+UPSERT_KEYS = (
+    ('ohlcv', 'uq_ohlcv_symbol_ts', ('symbol_id', 'timestamp')),
+    ('social_metrics', 'ix_social_metrics_symbol_date', ('symbol', 'date')),
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def count_duplicate_keys(conn, table: str, columns) -> int:
+    """
+    Rows that would have to go before a unique index on `columns` can be built (every
+    row of a duplicated key beyond the first). Keys with a NULL column are not counted:
+    SQLite treats NULLs as distinct, so they never block the index.
+    """
+    cols = ', '.join(columns)
+    not_null = ' AND '.join(f"{c} IS NOT NULL" for c in columns)
+    return conn.execute(text(
+        f"SELECT COALESCE(SUM(n - 1), 0) FROM "
+        f"(SELECT COUNT(*) AS n FROM {table} WHERE {not_null} GROUP BY {cols} HAVING COUNT(*) > 1)"
+    )).scalar()
+
+def _ensure_upsert_keys(engine, existing_tables) -> None:
+    """
+    create_all never alters tables that already exist, so databases created before these
+    keys were added lack them and every upsert fails. Adds any missing key; if duplicate
+    rows prevent it, raises instead of touching the data (see scripts/dedupe_upsert_keys.py).
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, name, columns in UPSERT_KEYS:
+            if table not in existing_tables:
+                continue  # just created by create_all, with its key
+            keys = {tuple(c['column_names']) for c in inspector.get_unique_constraints(table)}
+            keys |= {tuple(i['column_names']) for i in inspector.get_indexes(table) if i['unique']}
+            if columns in keys:
+                continue
+            duplicates = count_duplicate_keys(conn, table, columns)
+            if duplicates:
+                raise RuntimeError(
+                    f"Cannot add unique key {name} to {table}: {duplicates} duplicate rows on "
+                    f"({', '.join(columns)}). Run `python -m scripts.dedupe_upsert_keys` to review "
+                    f"and remove them, then restart."
+                )
+            conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+            logger.info(f"Added unique key {name} to existing table {table}")
 
-# Base for declarative models, but we will use the one from db.models
-# to ensure all models are registered.
-from .models import Base
+def init_db() -> None:
+    """
+    Creates the data directory, any missing tables, and any unique keys missing from
+    existing tables. Call once at application startup.
+    """
+    # Use the Base from db.models to ensure all models are registered.
+    from .models import Base
 
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    os.makedirs(DATA_DIR, exist_ok=True)
+    engine = get_engine()
+    existing_tables = set(inspect(engine).get_table_names())
+    Base.metadata.create_all(bind=engine)
+    _ensure_upsert_keys(engine, existing_tables)
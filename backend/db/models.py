@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 import datetime
@@ -13,6 +13,9 @@ class Symbol(Base):
 
 class OHLCV(Base):
     __tablename__ = "ohlcv"
+    # One candle per symbol per timestamp; the constraint's index also serves the
+    # per-symbol time-ordered reads and lets bulk inserts use ON CONFLICT
+    __table_args__ = (UniqueConstraint("symbol_id", "timestamp", name="uq_ohlcv_symbol_ts"),)
     id = Column(Integer, primary_key=True, index=True)
     symbol_id = Column(Integer, ForeignKey("symbols.id"))
     symbol = relationship("Symbol", back_populates="ohlcv_data")
@@ -47,6 +50,8 @@ class Signal(Base):
 
 class SocialMetric(Base):
     __tablename__ = "social_metrics"
+    # One row per symbol per day; serves the (symbol, date range) trend lookups
+    __table_args__ = (Index("ix_social_metrics_symbol_date", "symbol", "date", unique=True),)
     id = Column(Integer, primary_key=True, index=True)
     symbol = Column(String, index=True)
     date = Column(DateTime, index=True)
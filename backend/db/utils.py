@@ -1,10 +1,11 @@
 import logging
 from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import sessionmaker, Session
 from . import models
 import os
 
-logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
 
@@ -17,12 +18,21 @@ def get_db_session():
     """
     return SessionLocal()
 
+def dialect_insert(db: Session, model):
+    """
+    Returns an INSERT construct for the session's dialect, so callers can use
+    on_conflict_do_nothing / on_conflict_do_update on both SQLite and PostgreSQL.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
 def store_data(db: Session, data, model_name: str):
     """
     A placeholder function to store data in the database.
     This should be implemented to handle different data types and models.
     """
-    logging.info(f"Storing data for {model_name}...")
+    logger.info("Storing data for %s...", model_name)
     # Example:
     # for _, row in data.iterrows():
     #     db_item = models.YourModel(**row.to_dict())
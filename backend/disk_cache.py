@@ -0,0 +1,36 @@
+import json
+import logging
+import os
+import time
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Shared on-disk cache for slow-changing exchange metadata (markets, symbol lists).
+CACHE_DIR = os.getenv("STOCKAST_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "stockast"))
+
+def cache_path(name: str) -> str:
+    return os.path.join(CACHE_DIR, name)
+
+def load_json(name: str, ttl_seconds: float) -> Optional[Any]:
+    """Returns the cached JSON payload, or None if it is missing, stale, or unreadable."""
+    path = cache_path(name)
+    try:
+        if time.time() - os.path.getmtime(path) > ttl_seconds:
+            return None
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def dump_json(name: str, data: Any):
+    """Writes the payload atomically so concurrent readers never see a partial file."""
+    path = cache_path(name)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, default=str)
+        os.replace(tmp_path, path)
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning("Could not write cache file %s: %s", path, e)
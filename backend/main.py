@@ -1,9 +1,14 @@
 import uvicorn
 from fastapi import FastAPI, Request, Response, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 import logging
+import logging.config
 import time
 from api.routes import router as api_router
+from api.mexc import close_client_pool
+from api.market_data import market_data_service
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 from starlette.datastructures import MutableHeaders
 from starlette.middleware.base import BaseHTTPMiddleware
@@ -13,30 +18,49 @@ from pydantic import BaseModel
 from typing import Optional
 import numpy as np
 import torch
-from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from sqlalchemy.orm import Session
 
 from ml.data_fetcher import fetch_exchange_info, fetch_multi_histories
 from ml.data_sampler import generate_samples
 from ml.train import train_hrm
-from db.utils import get_db
-from db.models import Symbol, Base
-from db.utils import engine
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+from db.database import SessionLocal, init_db
+from db.models import Symbol
+
+# Configure logging once for the whole app; modules only call logging.getLogger(__name__).
+# Application records share uvicorn's formatter so both streams read the same.
+LOGGING_CONFIG = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'default': {
+            '()': 'uvicorn.logging.DefaultFormatter',
+            'fmt': '%(levelprefix)s %(asctime)s %(name)s: %(message)s',
+        },
+    },
+    'handlers': {
+        'default': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'default',
+            'stream': 'ext://sys.stderr',
+        },
+    },
+    'root': {'handlers': ['default'], 'level': 'INFO'},
+}
+logging.config.dictConfig(LOGGING_CONFIG)
 logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="Stockast API",
     description="API for the Stockast trading bot and sentiment analysis.",
     version="0.1.0",
+    # orjson serializes the numeric-heavy OHLCV/sentiment payloads much faster than stdlib json
+    default_response_class=ORJSONResponse,
 )
 
-scheduler = BackgroundScheduler()
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Runs on the app's event loop: coroutine jobs are awaited directly and plain functions
+# go to the loop's default thread executor. Missed runs collapse and runs never overlap.
+scheduler = AsyncIOScheduler(job_defaults={'coalesce': True, 'max_instances': 1, 'misfire_grace_time': 60})
 
 # --- API Key Persistence ---
 CONFIG_FILE = "config.json"
@@ -46,22 +70,41 @@ class ApiKeys(BaseModel):
     exchange_api_secret: str
     santiment_api_key: str
 
+# Keys only change through POST /api/keys, so keep the parsed file in memory
+# instead of re-reading config.json on every status poll.
+_cached_api_keys: Optional[ApiKeys] = None
+_api_keys_loaded = False
+
 def load_api_keys() -> Optional[ApiKeys]:
+    global _cached_api_keys, _api_keys_loaded
+    if _api_keys_loaded:
+        return _cached_api_keys
     if os.path.exists(CONFIG_FILE):
         with open(CONFIG_FILE, 'r') as f:
-            return ApiKeys(**json.load(f))
-    return None
+            _cached_api_keys = ApiKeys(**json.load(f))
+    else:
+        _cached_api_keys = None
+    _api_keys_loaded = True
+    return _cached_api_keys
+
+def invalidate_api_keys_cache():
+    global _api_keys_loaded
+    _api_keys_loaded = False
 
 # CORS (Cross-Origin Resource Sharing) Middleware
 # This allows your React Native frontend (running on a different port)
 # to communicate with this backend.
-# In a production environment, you should restrict origins for security.
+# Set FRONTEND_ORIGIN (comma-separated) to the frontend's origin(s) in production;
+# it falls back to allowing all origins for local development. Credentialed requests
+# are only allowed for explicitly listed origins, never with the "*" wildcard.
+FRONTEND_ORIGINS = [origin.strip() for origin in os.getenv("FRONTEND_ORIGIN", "*").split(",") if origin.strip()]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Allows all origins
-    allow_credentials=True,
+    allow_origins=FRONTEND_ORIGINS,
+    allow_credentials="*" not in FRONTEND_ORIGINS,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    max_age=600,  # Let browsers cache preflight results instead of probing every call
 )
 
 class LoggingMiddleware(BaseHTTPMiddleware):
@@ -83,6 +126,10 @@ class LoggingMiddleware(BaseHTTPMiddleware):
 
 app.add_middleware(LoggingMiddleware)
 
+# Added last so it wraps LoggingMiddleware, which then still logs uncompressed bodies.
+# OHLCV and sentiment JSON is mostly digits and compresses very well.
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # --- Startup Checks ---
 def startup_checks(db: Session):
     """
@@ -109,12 +156,25 @@ def startup_checks(db: Session):
     logging.info("Startup checks complete.")
 
 @app.on_event("startup")
-def startup_event():
-    db = next(get_db())
-    startup_checks(db)
-    scheduler.add_job(lambda: fetch_exchange_info(refresh=True), 'interval', hours=24)  # Daily refresh
+async def startup_event():
+    init_db()
+    db = SessionLocal()
+    try:
+        startup_checks(db)
+    finally:
+        db.close()
+    scheduler.add_job(
+        lambda: fetch_exchange_info(refresh=True), 'interval', hours=24,  # Daily refresh
+        id='refresh_exchange_info', replace_existing=True,
+    )
     scheduler.start()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    scheduler.shutdown(wait=False)
+    await market_data_service.close()
+    await close_client_pool()
+
 # Include the API router from api/routes.py
 # All routes defined in that file will be prefixed with /api
 app.include_router(api_router, prefix="/api")
@@ -143,6 +203,7 @@ async def save_api_keys(keys: ApiKeys):
     try:
         with open(CONFIG_FILE, 'w') as f:
             json.dump(keys.dict(), f, indent=4)
+        invalidate_api_keys_cache()
         return {"message": "API keys saved successfully."}
     except Exception as e:
         logger.error(f"Failed to save API keys: {e}")
@@ -173,4 +234,5 @@ if __name__ == "__main__":
     else:
         logger.warning("API keys not found. Waiting for frontend to provide them.")
     logger.info("Starting Uvicorn server...")
-    uvicorn.run("main:app", host="0.0.0.0", port=3000, reload=True, log_level="debug")
\ No newline at end of file
+    # loop="auto" selects uvloop when it is installed (non-Windows) and falls back to asyncio otherwise
+    uvicorn.run("main:app", host="0.0.0.0", port=3000, reload=True, log_level="debug", loop="auto")
\ No newline at end of file
@@ -1,39 +1,52 @@
 import logging
+import time
 import ccxt
 import pandas as pd
 from typing import List, Dict, Optional, Any
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from config import TTL_SECONDS
 
-# In-memory cache for exchange info to avoid frequent API calls
+logger = logging.getLogger(__name__)
+
+FETCH_WORKERS = 10
+HTTP_POOL_SIZE = 32  # keep-alive connections per host; at least FETCH_WORKERS
+
+# In-memory cache for exchange info to avoid frequent API calls.
+# Markets change rarely, so entries are served for TTL_SECONDS['markets'] before refetching.
 _exchange_info_cache = None
+_exchange_info_fetched_at = 0.0
 _exchange_instance = None
 
 def fetch_exchange_info(refresh: bool = False) -> Dict:
     """
         A dictionary containing exchange information.
     """
-    global _exchange_info_cache, _exchange_instance
+    global _exchange_info_cache, _exchange_info_fetched_at, _exchange_instance
     if _exchange_instance is None:
         _exchange_instance = ccxt.mexc({'enableRateLimit': True})
 
-    if _exchange_info_cache is None or refresh:
+    expired = time.monotonic() - _exchange_info_fetched_at > TTL_SECONDS['markets']
+    if _exchange_info_cache is None or refresh or expired:
         try:
-            logging.info("Fetching exchange info...")
-            _exchange_info_cache = _exchange_instance.load_markets()
-            logging.info("Successfully fetched and cached new exchange info.")
+            logger.info("Fetching exchange info...")
+            # reload=True: ccxt otherwise returns its own cached markets after the first load
+            _exchange_info_cache = _exchange_instance.load_markets(reload=True)
+            _exchange_info_fetched_at = time.monotonic()
+            logger.info("Successfully fetched and cached new exchange info.")
         except Exception as e:
-            logging.error(f"Failed to fetch exchange info: {e}")
+            logger.error("Failed to fetch exchange info: %s", e)
             return {}
     else:
-        logging.info("Using cached exchange info.")
+        logger.info("Using cached exchange info.")
     return _exchange_info_cache
 
 def get_top_symbols(exchange: ccxt.Exchange, limit: int = 50) -> List[str]:
     """Fetch top spot symbols by quote volume (USDT pairs for diversity)."""
     try:
-        logging.info(f"Fetching top {limit} symbols by quote volume...")
+        logger.info("Fetching top %s symbols by quote volume...", limit)
 
         # fetch_tickers() retrieves 24hr stats for all symbols when called without arguments.
         # This corresponds to the documented GET /api/v3/ticker/24hr endpoint and avoids
@@ -41,7 +54,7 @@ def get_top_symbols(exchange: ccxt.Exchange, limit: int = 50) -> List[str]:
         all_tickers = exchange.fetch_tickers()
 
         if not all_tickers:
-            logging.error("exchange.fetch_tickers() returned no data. Check API key permissions for ticker endpoints.")
+            logger.error("exchange.fetch_tickers() returned no data. Check API key permissions for ticker endpoints.")
             return []
         
         # Filter tickers that are USDT spot pairs and have quoteVolume
@@ -53,16 +66,16 @@ def get_top_symbols(exchange: ccxt.Exchange, limit: int = 50) -> List[str]:
         ]
         
         if not valid_tickers:
-            logging.warning("Could not find any valid USDT spot tickers with quoteVolume from the fetched tickers.")
+            logger.warning("Could not find any valid USDT spot tickers with quoteVolume from the fetched tickers.")
             return []
 
         sorted_pairs = sorted(valid_tickers, key=lambda x: x[1], reverse=True)
 
         top_symbols = [p[0] for p in sorted_pairs[:limit]]
-        logging.info(f"Successfully identified {len(top_symbols)} top symbols.")
+        logger.info("Successfully identified %s top symbols.", len(top_symbols))
         return top_symbols
     except Exception as e:
-        logging.error(f"Failed to get top symbols: {e}", exc_info=True)
+        logger.error("Failed to get top symbols: %s", e, exc_info=True)
         return []
 
 def fetch_one_history(sym: str, exchange: Any, days_back: int = 365, timeframe='1h', limit=1000) -> Optional[pd.DataFrame]:
@@ -76,20 +89,34 @@ def fetch_one_history(sym: str, exchange: Any, days_back: int = 365, timeframe='
         timeframe (str): The timeframe to fetch (e.g., '1h', '1d').
         limit (int): The number of candles to fetch per request.
     """
-    logging.debug(f"Fetching history for {sym} with timeframe {timeframe} for {days_back} days...")
+    logger.debug("Fetching history for %s with timeframe %s for %s days...", sym, timeframe, days_back)
     since = int((pd.Timestamp.now(tz='UTC') - pd.Timedelta(days=days_back)).timestamp() * 1000)
     try:
         ohlcv = exchange.fetch_ohlcv(sym, timeframe, since=since, limit=limit)
         if not ohlcv:
-            logging.warning(f"No OHLCV data returned for {sym}.")
+            logger.warning("No OHLCV data returned for %s.", sym)
             return None
         df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
         df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
         return df
     except Exception as e:
-        logging.error(f"Failed to fetch history for {sym}: {e}")
+        logger.error("Failed to fetch history for %s: %s", sym, e)
         return None
 
+def configure_http_pool(exchange: ccxt.Exchange):
+    """
+    Mounts a larger keep-alive connection pool (with retries on transient failures)
+    on the exchange's requests session, so parallel fetches reuse TCP/TLS connections
+    instead of opening new ones once requests' default 10-connection pool is full.
+    """
+    if getattr(exchange.session.get_adapter('https://'), '_pool_maxsize', 0) >= HTTP_POOL_SIZE:
+        return
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE,
+        max_retries=Retry(total=3, backoff_factor=0.3),
+    )
+    exchange.session.mount('https://', adapter)
+
 def fetch_multi_histories(exchange: ccxt.Exchange, symbols: List[str], timeframe: str = '1h', days_back: int = 365) -> Dict[str, pd.DataFrame]:
     """
     Fetches historical data for multiple symbols in parallel.
@@ -103,10 +130,11 @@ def fetch_multi_histories(exchange: ccxt.Exchange, symbols: List[str], timeframe
     Returns:
         A dictionary mapping symbols to their historical data as DataFrames.
     """
-    logging.info(f"Initiating parallel fetch for {len(symbols)} symbols using provided exchange client...")
+    logger.info("Initiating parallel fetch for %s symbols using provided exchange client...", len(symbols))
     histories = {}
+    configure_http_pool(exchange)
 
-    with ThreadPoolExecutor(max_workers=10) as executor:
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
         # Map each symbol to a future
         future_to_symbol = {executor.submit(fetch_one_history, sym, exchange, days_back, timeframe): sym for sym in symbols}
         
@@ -117,7 +145,7 @@ def fetch_multi_histories(exchange: ccxt.Exchange, symbols: List[str], timeframe
                 if df is not None and not df.empty:
                     histories[symbol] = df
             except Exception as exc:
-                logging.error(f'{symbol} generated an exception: {exc}')
+                logger.error('%s generated an exception: %s', symbol, exc)
     
-    logging.info(f"Successfully fetched histories for {len(histories)} out of {len(symbols)} symbols.")
+    logger.info("Successfully fetched histories for %s out of %s symbols.", len(histories), len(symbols))
     return histories
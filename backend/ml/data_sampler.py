@@ -1,23 +1,29 @@
 import argparse
 import logging
+import os
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 
 import ccxt
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import pandas as pd
 import torch
-from numpy.polynomial.legendre import Legendre
+from numpy.polynomial import legendre
 
 # Assuming rgb_processor is in ../utils/
 from ml.rgb_processor import convert_to_rgb
 from ml.data_fetcher import fetch_multi_histories, get_top_symbols, fetch_one_history
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
 
 # --- HRM Grid Constants ---
 T, S, H, A = 84, 8, 3, 10
 
+STACK_CACHE_SIZE = 4  # stacked history sets kept by _stack_rgb
+_stack_cache: "OrderedDict[tuple, Tuple[tuple, np.ndarray]]" = OrderedDict()
+
 def build_4d_from_histories(histories: Dict[str, pd.DataFrame], lookback=60, horizon=24, hierarchy=3) -> np.ndarray:
     """
     Builds a 4D tensor (T, S, H, A) from a dictionary of historical data.
@@ -53,103 +59,133 @@ def build_4d_from_histories(histories: Dict[str, pd.DataFrame], lookback=60, hor
     # Initialize the 4D tensor
     tensor = np.full((T, S, hierarchy, A), np.nan, dtype=np.float32)
 
-    for s_idx, symbol in enumerate(symbols):
-        df = trimmed_histories[symbol].iloc[:T]
-
-        # Normalize data relativistically (0-1 % changes)
-        price_norm = (df['close'] - df['close'].min()) / (df['close'].max() - df['close'].min())
-        volume_norm = (df['volume'] - df['volume'].min()) / (df['volume'].max() - df['volume'].min())
-        
-        # Assuming RGB signals are pre-calculated and present in the DataFrame
-        # S=0-3: OHLC, S=4-7: RGB signals
-        tensor[:lookback, s_idx, 0, 0] = (df['open'][:lookback].pct_change() + 1).fillna(1)
-        tensor[:lookback, s_idx, 0, 1] = (df['high'][:lookback].pct_change() + 1).fillna(1)
-        tensor[:lookback, s_idx, 0, 2] = (df['low'][:lookback].pct_change() + 1).fillna(1)
-        tensor[:lookback, s_idx, 0, 3] = (df['close'][:lookback].pct_change() + 1).fillna(1)
-        
-        # RGB-derived signals in S=4-7
-        if all(col in df.columns for col in ['R', 'G', 'B']):
-            tensor[:lookback, s_idx, 1, 0] = df['R'][:lookback].values / 255.0
-            tensor[:lookback, s_idx, 1, 1] = df['G'][:lookback].values / 255.0
-            tensor[:lookback, s_idx, 1, 2] = df['B'][:lookback].values / 255.0
-        
-        # Mask future T slots (horizon) as NaN - already initialized with NaN
+    # Pivot to one (S, lookback, 4) OHLC array so every symbol is handled in the
+    # same vectorized expressions instead of one DataFrame at a time
+    frames = [trimmed_histories[symbol].iloc[:lookback] for symbol in symbols]
+    ohlc = np.stack([df[['open', 'high', 'low', 'close']].to_numpy(np.float32) for df in frames])
+
+    # Normalize data relativistically: bar-over-bar ratios (pct_change + 1),
+    # divided straight into the (lookback, S, 4) tensor slice
+    # S=0-3: OHLC, S=4-7: RGB signals
+    ohlc = ohlc.transpose(1, 0, 2)
+    ratio = tensor[:lookback, :, 0, 0:4]
+    ratio[0] = 1.0
+    np.divide(ohlc[1:], ohlc[:-1], out=ratio[1:])
+
+    # RGB-derived signals in S=4-7, for the symbols that carry them
+    rgb_idx = [i for i, df in enumerate(frames) if all(col in df.columns for col in ['R', 'G', 'B'])]
+    if rgb_idx:
+        rgb = np.stack([frames[i][['R', 'G', 'B']].to_numpy(np.float32) for i in rgb_idx])
+        tensor[:lookback, rgb_idx, 1, 0:3] = rgb.transpose(1, 0, 2) * (1.0 / 255.0)
+
+    # Mask future T slots (horizon) as NaN - already initialized with NaN
 
     return tensor
 
 
-def build_hrm_grids(rgb_histories: List[pd.DataFrame]) -> List[np.ndarray]:
+def _stack_rgb(rgb_histories: List[pd.DataFrame], min_len: int) -> np.ndarray:
+    """
+    Stacks the R/G/B/embed_4 channels into one read-only (num_histories, min_len, 4) array.
+    Memoized on each frame's identity, first/last index and length, so rebuilding grids
+    from the same histories (e.g. while tuning seq_len or num_samples) skips the copy.
+    Frames mutated in place without changing those are not detected.
+    """
+    key = tuple((id(h), h.index[0], h.index[-1], len(h)) for h in rgb_histories) + (min_len,)
+    cached = _stack_cache.get(key)
+    if cached is not None:
+        _stack_cache.move_to_end(key)
+        return cached[1]
+
+    stacked = np.stack([
+        h[['R', 'G', 'B', 'embed_4']].to_numpy(np.float32)[:min_len] for h in rgb_histories
+    ])
+    stacked.flags.writeable = False  # shared between calls
+    # Holding the frames keeps their ids from being reused while the entry lives
+    _stack_cache[key] = (tuple(rgb_histories), stacked)
+    if len(_stack_cache) > STACK_CACHE_SIZE:
+        _stack_cache.popitem(last=False)
+    return stacked
+
+def build_hrm_grids(rgb_histories: List[pd.DataFrame]) -> np.ndarray:
     """
     Builds 4D HRM grids from a list of RGB-processed histories.
     A grid is formed by taking T=84 steps from S=8 symbols.
+    Returns a single (G, T, S, H, A) array; grids[g] is one grid.
     """
-    grids = []
     num_histories = len(rgb_histories)
     if num_histories < S:
-        logging.warning(f"Not enough histories ({num_histories}) to form a full grid of {S} symbols.")
-        return []
+        logger.warning("Not enough histories (%s) to form a full grid of %s symbols.", num_histories, S)
+        return np.empty((0, T, S, H, A), dtype=np.float32)
 
     # Find the minimum length to ensure all symbols in a grid have enough data
     min_len = min(len(h) for h in rgb_histories)
     if min_len < T:
-        logging.warning(f"Histories are too short ({min_len}) to create grids of length {T}.")
-        return []
-
-    # Create overlapping grids
-    for i in range(0, num_histories - S + 1, S // 2): # Overlap by 50%
-        for t_start in range(0, min_len - T + 1, T // 4): # Overlap by 75%
-            grid = np.zeros((T, S, H, A), dtype=np.float32)
-            symbol_slice = rgb_histories[i : i + S]
-
-            for s_idx, history in enumerate(symbol_slice):
-                # Take T steps for the current symbol
-                time_slice = history.iloc[t_start : t_start + T]
-                
-                # Map the 4 channels (R,G,B,embed_4) into the (H, A) dimensions
-                # This is a simple mapping; a more complex one could be used.
-                # H=0: RGB, H=1: EMA, H=2: spare
-                grid[:, s_idx, 0, 0] = time_slice['R'].values
-                grid[:, s_idx, 0, 1] = time_slice['G'].values
-                grid[:, s_idx, 0, 2] = time_slice['B'].values
-                grid[:, s_idx, 1, 0] = time_slice['embed_4'].values
-            
-            grids.append(grid)
-    
-    logging.info(f"Built {len(grids)} HRM grids.")
+        logger.warning("Histories are too short (%s) to create grids of length %s.", min_len, T)
+        return np.empty((0, T, S, H, A), dtype=np.float32)
+
+    # Stack the 4 channels of every history once: (num_histories, min_len, 4)
+    stacked = _stack_rgb(rgb_histories, min_len)
+
+    # Create overlapping grids as strided views, no copies:
+    # 75% overlap in time, then 50% overlap across symbols.
+    # sliding_window_view appends the window axis last: (num_histories, nT, 4, T)
+    time_windows = sliding_window_view(stacked, T, axis=1)[:, ::T // 4]
+    # -> (nS, nT, 4, T, S), ordered like the old symbol-then-time loops
+    windows = sliding_window_view(time_windows, S, axis=0)[::S // 2]
+    windows = windows.transpose(0, 1, 3, 4, 2)  # (nS, nT, T, S, 4)
+
+    # Allocate every grid at once, then map the 4 channels (R,G,B,embed_4) into the
+    # (H, A) dimensions. This is a simple mapping; a more complex one could be used.
+    # H=0: RGB, H=1: EMA, H=2: spare
+    out = np.zeros(windows.shape[:4] + (H, A), dtype=np.float32)
+    out[..., 0, 0:3] = windows[..., 0:3]
+    out[..., 1, 0] = windows[..., 3]
+    grids = out.reshape(-1, T, S, H, A)  # (nS, nT, ...) is contiguous, so this is a view
+
+    logger.info("Built %s HRM grids.", len(grids))
     return grids
 
-def generate_training_samples(grids: List[np.ndarray], num_samples: int, seq_len: int = 60) -> torch.Tensor:
+def generate_training_samples(grids: np.ndarray, num_samples: int, seq_len: int = 60) -> torch.Tensor:
     """
     Flattens HRM grids and samples diverse windows for training.
     Each sample is a window of shape (seq_len, S * H * A).
+    `grids` is build_hrm_grids' (G, T, S, H, A) array (a list of grids also works).
     """
-    samples = []
-    if not grids:
+    if len(grids) == 0:
         return torch.empty(0)
 
-    # Flatten each grid from (T, S, H, A) to (T, S*H*A)
-    flattened_grids = [grid.reshape(T, -1) for grid in grids]
+    # Flatten every grid from (T, S, H, A) to (T, S*H*A), one row per time step;
+    # a view when given build_hrm_grids' contiguous array
+    num_grids = len(grids)
+    flat_rows = np.asarray(grids, dtype=np.float32).reshape(num_grids * T, -1)
+    num_possible_starts = T - seq_len + 1
+    if num_possible_starts < 1:
+        return torch.empty(0)
 
     # Calculate how many samples to draw from each grid to ensure diversity
-    num_per_grid = max(1, num_samples // len(flattened_grids))
-
-    for flat_grid in flattened_grids:
-        if len(flat_grid) < seq_len:
-            continue # Should not happen if checks are done before
-        
-        # Randomly select starting points for windows
-        num_possible_starts = len(flat_grid) - seq_len + 1
-        replace = num_possible_starts < num_per_grid
-        start_indices = np.random.choice(num_possible_starts, num_per_grid, replace=replace)
-
-        for start in start_indices:
-            samples.append(flat_grid[start : start + seq_len])
-            if len(samples) >= num_samples:
-                break
-        if len(samples) >= num_samples:
-            break
-
-    return torch.tensor(np.array(samples), dtype=torch.float32)
+    num_per_grid = max(1, num_samples // num_grids)
+
+    # Draw every grid's starting points in one go
+    rng = np.random.default_rng()
+    if num_possible_starts < num_per_grid:
+        starts = rng.integers(0, num_possible_starts, size=(num_grids, num_per_grid))
+    else:
+        # Without replacement: the first num_per_grid of a random permutation per grid
+        starts = np.argsort(rng.random((num_grids, num_possible_starts)), axis=1)[:, :num_per_grid]
+
+    # Grid-major order, capped at num_samples like the old append loop
+    grid_idx = np.repeat(np.arange(num_grids), num_per_grid)[:num_samples]
+    start_idx = starts.reshape(-1)[:num_samples]
+    row_idx = (grid_idx * T + start_idx)[:, None] + np.arange(seq_len)
+
+    # Gather straight into the preallocated output: one allocation, one copy.
+    # Page-locked when a GPU is present so .to(device, non_blocking=True) can overlap the copy
+    samples = torch.empty(
+        (len(row_idx), seq_len, flat_rows.shape[1]), dtype=torch.float32,
+        pin_memory=torch.cuda.is_available(),
+    )
+    np.take(flat_rows, row_idx, axis=0, out=samples.numpy())
+    return samples
 
 def flatten_to_matrix_sequence(grid: torch.Tensor, mode='row_major') -> torch.Tensor:
     """
@@ -188,21 +224,15 @@ def flatten_to_polynomial_sequence(grid: torch.Tensor, degree=3) -> torch.Tensor
         raise ValueError(f"Input grid must be 2D, but got {grid.dim()} dimensions.")
 
     grid_np = grid.numpy()
-    all_coeffs = []
 
     # Create the x-axis for fitting, normalized to [-1, 1] for Legendre polynomials
     x = np.linspace(-1, 1, grid.shape[1])
 
-    for row_signal in grid_np:
-        # Fit a Legendre polynomial of the specified degree
-        poly = Legendre.fit(x, row_signal, deg=degree)
-        
-        # Get the coefficients and append to our list
-        # .convert().coef gives coefficients in standard power basis, which is fine
-        coeffs = poly.convert().coef
-        all_coeffs.extend(coeffs)
-
-    return torch.tensor(all_coeffs, dtype=torch.float32)
+    # Every row shares x, so one design matrix and one least-squares solve fit all
+    # rows at once: (deg+1, rows) Legendre-basis coefficients, one row per grid row out
+    vander = legendre.legvander(x, degree)
+    leg_coeffs, *_ = np.linalg.lstsq(vander, grid_np.T, rcond=None)
+    return torch.from_numpy(np.ascontiguousarray(leg_coeffs.T, dtype=np.float32).reshape(-1))
 
 def generate_puzzle_samples(histories: Dict[str, pd.DataFrame], output_dir: str, seq_len=84, num_samples=5000, vocab_size=256):
     """
@@ -216,7 +246,7 @@ def generate_puzzle_samples(histories: Dict[str, pd.DataFrame], output_dir: str,
         num_samples (int): The total number of samples to generate.
         vocab_size (int): The number of discrete bins for quantization.
     """
-    logging.info(f"Starting puzzle sample generation for pre-training...")
+    logger.info("Starting puzzle sample generation for pre-training...")
     os.makedirs(output_dir, exist_ok=True)
 
     all_series_data = []
@@ -229,42 +259,44 @@ def generate_puzzle_samples(histories: Dict[str, pd.DataFrame], output_dir: str,
             series = rgb_df[['R', 'G', 'B']].values
             all_series_data.append(series)
         except Exception:
-            logging.warning(f"Could not process {symbol} for puzzle generation.", exc_info=True)
+            logger.warning("Could not process %s for puzzle generation.", symbol, exc_info=True)
 
     if not all_series_data:
-        logging.error("No valid RGB series data could be generated. Aborting.")
+        logger.error("No valid RGB series data could be generated. Aborting.")
         return
 
-    # Create windows from all available data
-    all_windows = []
-    for series in all_series_data:
-        num_possible_starts = len(series) - seq_len + 1
-        for i in range(num_possible_starts):
-            all_windows.append(series[i:i+seq_len])
+    # Number every possible window across all series instead of materializing a
+    # list of them: window k lives in the series whose offset range contains k
+    window_counts = np.array([len(series) - seq_len + 1 for series in all_series_data])
+    offsets = np.concatenate(([0], np.cumsum(window_counts)))
+    total_windows = int(offsets[-1])
 
-    if len(all_windows) < num_samples:
-        logging.warning(f"Only able to generate {len(all_windows)} samples, requested {num_samples}.")
-        num_samples = len(all_windows)
+    if total_windows < num_samples:
+        logger.warning("Only able to generate %s samples, requested %s.", total_windows, num_samples)
+        num_samples = total_windows
 
     # Randomly select final samples and save them as individual tokenized files
-    selected_indices = np.random.choice(len(all_windows), num_samples, replace=False)
-    for i, idx in enumerate(selected_indices):
-        window = all_windows[idx]
+    selected_indices = np.random.default_rng().choice(total_windows, num_samples, replace=False)
+    series_idx = np.searchsorted(offsets, selected_indices, side='right') - 1
+    start_idx = selected_indices - offsets[series_idx]
+    for i, (s_idx, start) in enumerate(zip(series_idx, start_idx)):
+        window = all_series_data[s_idx][start:start + seq_len]
         # Quantize float values (0-255) into discrete integer tokens (0-vocab_size-1)
         tokens = (window / 256.0 * vocab_size).astype(np.int32)
         # Save as a flat sequence of tokens, which PuzzleDataset can read
         tokens.tofile(os.path.join(output_dir, f"puzzle_{i}.bin"))
 
-    logging.info(f"Successfully generated and saved {num_samples} tokenized puzzle files to '{output_dir}'.")
+    logger.info("Successfully generated and saved %s tokenized puzzle files to '%s'.", num_samples, output_dir)
 
 
 if __name__ == "__main__":
     # This block is for demonstration and testing of the data_sampler module.
     # The primary entry point for building the dataset and training the model
     # is now located in `scripts/build_and_train.py`.
-    logging.info("Running data_sampler.py as a standalone script for demonstration.")
-    logging.info("This will not train the model. To build the dataset and train, run:")
-    logging.info("python scripts/build_and_train.py")
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    logger.info("Running data_sampler.py as a standalone script for demonstration.")
+    logger.info("This will not train the model. To build the dataset and train, run:")
+    logger.info("python scripts/build_and_train.py")
 
     # You can add simple test logic here if needed, for example:
     # exchange = ccxt.mexc()
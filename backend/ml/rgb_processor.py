@@ -1,17 +1,99 @@
 import logging
 import pandas as pd
 import numpy as np
+from numba import njit
 from typing import Optional
 
 # Hypothetical imports from your existing utils
 # from . import indicators
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+ROLLING_WINDOW = 20  # bars in the SMA baselines used for relativistic normalization
+EMA_SPAN = 10
+
+_RNG = np.random.default_rng()
 
 def calculate_ema(series: pd.Series, span: int = 10) -> pd.Series:
     """Calculates the Exponential Moving Average."""
     return series.ewm(span=span, adjust=False).mean()
 
+@njit(cache=True)
+def _clip_255(x):
+    """np.clip(x, 0, 255) for a scalar, keeping NaN as NaN."""
+    if np.isnan(x):
+        return x
+    return min(max(x, 0.0), 255.0)
+
+@njit(cache=True, error_model='numpy')
+def _rgb_kernel(close, high, low, volume, out_r, out_b, out_line):
+    """
+    Computes the R and B channels (0-255, NaN until the rolling baselines fill) and
+    the close-price EMA in one fused pass, keeping the rolling sums and the EMA as
+    running recurrences instead of materializing intermediate series. The EMA is
+    then min-max normalized over the rows that have R and B.
+    """
+    n = len(close)
+    volatility = np.empty(n)
+    volume_total = 0.0
+    volatility_total = 0.0
+    for i in range(n):
+        # Volatility (High-Low range as a percentage of the low)
+        volatility[i] = (high[i] - low[i]) / low[i] * 100.0
+        volume_total += volume[i]
+        volatility_total += volatility[i]
+    volume_mean = volume_total / n
+    volatility_mean = volatility_total / n
+
+    alpha = 2.0 / (EMA_SPAN + 1.0)
+    ema = close[0]
+    volume_sum = 0.0
+    volatility_sum = 0.0
+    min_line = np.inf
+    max_line = -np.inf
+    for i in range(n):
+        volume_sum += volume[i]
+        volatility_sum += volatility[i]
+        if i >= ROLLING_WINDOW:
+            volume_sum -= volume[i - ROLLING_WINDOW]
+            volatility_sum -= volatility[i - ROLLING_WINDOW]
+
+        # Line: Price EMA for trend context (pandas ewm with adjust=False)
+        if i > 0:
+            ema = alpha * close[i] + (1.0 - alpha) * ema
+        out_line[i] = ema
+
+        if i < ROLLING_WINDOW - 1:
+            out_r[i] = np.nan
+            out_b[i] = np.nan
+            continue
+
+        # R: Volume change % relative to the volume SMA's share of the mean volume
+        r_divisor = volume_sum / ROLLING_WINDOW / volume_mean
+        if r_divisor == 0.0:
+            r_divisor = 1.0  # Avoid division by zero
+        volume_pct = (volume[i] - volume[i - 1]) / volume[i - 1] * 100.0
+        out_r[i] = _clip_255(volume_pct / r_divisor * 2.55)
+
+        # B: Volatility relative to its recent simple moving average
+        b_divisor = volatility_sum / ROLLING_WINDOW / volatility_mean
+        if b_divisor == 0.0:
+            b_divisor = 1.0  # Avoid division by zero
+        out_b[i] = _clip_255(volatility[i] / b_divisor * 2.55)
+
+        # Track the EMA range inline for rows that survive the NaN trim
+        if not (np.isnan(out_r[i]) or np.isnan(out_b[i])):
+            min_line = min(min_line, ema)
+            max_line = max(max_line, ema)
+
+    # Normalize the EMA line value relative to its own min/max in the series
+    if max_line - min_line > 1e-8:
+        scale = 1.0 / (max_line - min_line)
+        for i in range(n):
+            out_line[i] = (out_line[i] - min_line) * scale
+    else:
+        out_line[:] = 0.5  # Assign a neutral value if data is flat (or no row survived)
+
 def convert_to_rgb(df: pd.DataFrame) -> Optional[pd.DataFrame]:
     """
     Converts OHLCV DataFrame to an RGB + Line format using relativistic normalization.
@@ -28,69 +110,53 @@ def convert_to_rgb(df: pd.DataFrame) -> Optional[pd.DataFrame]:
         A new DataFrame with 'R', 'G', 'B', 'embed_4' columns, or None if input is invalid.
     """
     if not all(col in df.columns for col in ['open', 'high', 'low', 'close', 'volume']):
-        logging.error("Input DataFrame is missing required OHLCV columns.")
+        logger.error("Input DataFrame is missing required OHLCV columns.")
         return None
 
     if len(df) < 21: # Need enough data for rolling calculations
-        logging.warning("DataFrame has insufficient data for RGB conversion, skipping.")
+        logger.warning("DataFrame has insufficient data for RGB conversion, skipping.")
         return None
 
-    proc_df = df.copy()
-
     try:
-        # --- Relativistic Features ---
-        # 1. Price Change %
-        proc_df['change_pct'] = proc_df['close'].pct_change() * 100
-
-        # 2. Volume Change %
-        proc_df['volume_pct'] = proc_df['volume'].pct_change() * 100
-
-        # 3. Volatility (High-Low range as a percentage of the low)
-        proc_df['volatility_pct'] = (proc_df['high'] - proc_df['low']) / proc_df['low'] * 100
-
-        # 4. Sentiment (Placeholder - replace with actual data source, e.g., LunarCrush)
-        proc_df['sentiment_pct'] = np.random.uniform(30, 80, len(proc_df))
-
-        # --- Normalization References ---
-        # Use rolling means to create a dynamic baseline for normalization
-        vol_sma = proc_df['volume'].rolling(20).mean()
-        volatility_sma = proc_df['volatility_pct'].rolling(20).mean()
-
-        # --- Channel Calculations (Relativistic Normalization) ---
-        # R: Volume strength relative to its recent simple moving average
-        # The divisor avoids division by zero and normalizes the percentage change
-        r_divisor = (vol_sma / proc_df['volume'].mean())
-        r_divisor.replace(0, 1, inplace=True) # Avoid division by zero
-        proc_df['R'] = np.clip((proc_df['volume_pct'] / r_divisor) * 2.55, 0, 255)
-
-        # G: Sentiment score, scaled from 0-100 to 0-255
-        proc_df['G'] = np.clip(proc_df['sentiment_pct'] * 2.55, 0, 255)
-
-        # B: Volatility relative to its recent simple moving average
-        b_divisor = (volatility_sma / proc_df['volatility_pct'].mean())
-        b_divisor.replace(0, 1, inplace=True) # Avoid division by zero
-        proc_df['B'] = np.clip((proc_df['volatility_pct'] / b_divisor) * 2.55, 0, 255)
-
-        # Line: Price EMA for trend context
-        proc_df['embed_4'] = calculate_ema(proc_df['close'], span=10)
+        # Work on the raw column arrays; no copy of the whole frame is needed.
+        # C-contiguous float64 for the kernel's sequential loops
+        close = np.ascontiguousarray(df['close'].to_numpy(), dtype=np.float64)
+        high = np.ascontiguousarray(df['high'].to_numpy(), dtype=np.float64)
+        low = np.ascontiguousarray(df['low'].to_numpy(), dtype=np.float64)
+        volume = np.ascontiguousarray(df['volume'].to_numpy(), dtype=np.float64)
+        index = df.index
+
+        # The kernel's running sums assume complete bars, so drop incomplete ones first
+        complete = ~(np.isnan(close) | np.isnan(high) | np.isnan(low) | np.isnan(volume))
+        if not complete.all():
+            close, high, low, volume = close[complete], high[complete], low[complete], volume[complete]
+            index = index[complete]
+        if len(close) < ROLLING_WINDOW + 1:
+            logger.warning("DataFrame has insufficient complete bars for RGB conversion, skipping.")
+            return None
+
+        n = len(close)
+        out_r = np.empty(n, dtype=np.float32)
+        out_b = np.empty(n, dtype=np.float32)
+        out_line = np.empty(n, dtype=np.float32)
+        _rgb_kernel(close, high, low, volume, out_r, out_b, out_line)
 
         # Drop rows with NaN values resulting from rolling calculations
-        proc_df.dropna(inplace=True)
+        valid = ~(np.isnan(out_r) | np.isnan(out_b))
+        out_r, out_b, out_line, index = out_r[valid], out_b[valid], out_line[valid], index[valid]
 
         # --- Final Normalization to 0-1 range for the model ---
         # Normalize RGB channels
-        proc_df[['R', 'G', 'B']] = proc_df[['R', 'G', 'B']] / 255.0
+        out_r *= 1.0 / 255.0
+        out_b *= 1.0 / 255.0
 
-        # Normalize the EMA line value relative to its own min/max in the series
-        min_embed = proc_df['embed_4'].min()
-        max_embed = proc_df['embed_4'].max()
-        if (max_embed - min_embed) > 1e-8:
-            proc_df['embed_4'] = (proc_df['embed_4'] - min_embed) / (max_embed - min_embed)
-        else:
-            proc_df['embed_4'] = 0.5 # Assign a neutral value if data is flat
+        # G: Sentiment (Placeholder - replace with actual data source, e.g., LunarCrush).
+        # A 30-80 score scaled to 0-255 and normalized, i.e. drawn directly from [0.3, 0.8]
+        out_g = _RNG.uniform(0.3, 0.8, len(out_r)).astype(np.float32)
+        # embed_4 comes back from the kernel already min-max normalized
 
-        return proc_df[['R', 'G', 'B', 'embed_4']]
+        return pd.DataFrame({'R': out_r, 'G': out_g, 'B': out_b, 'embed_4': out_line}, index=index)
 
     except Exception as e:
-        logging.error(f"An error occurred during RGB conversion: {e}", exc_info=True)
+        logger.error("An error occurred during RGB conversion: %s", e, exc_info=True)
         return None
\ No newline at end of file
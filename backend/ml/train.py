@@ -1,6 +1,6 @@
 import logging
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
 
 def train_hrm(*args, **kwargs):
     """
@@ -9,5 +9,5 @@ def train_hrm(*args, **kwargs):
     which is orchestrated by `scripts/build_and_train.py`.
     """
     error_message = "The `train_hrm` function is deprecated. Please run `python scripts/build_and_train.py` to train the model."
-    logging.error(error_message)
+    logger.error(error_message)
     raise NotImplementedError(error_message)
\ No newline at end of file
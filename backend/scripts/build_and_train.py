@@ -6,8 +6,11 @@ import numpy as np
 from dotenv import load_dotenv
 import ccxt
 
-# Add the backend root to the Python path to allow for module imports
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# Add the backend root to the Python path to allow for module imports.
+# Skipped when it is already importable (e.g. PYTHONPATH set or run with `python -m`).
+BACKEND_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if BACKEND_ROOT not in sys.path:
+    sys.path.append(BACKEND_ROOT)
 
 from ml.data_fetcher import get_top_symbols, fetch_multi_histories
 from ml.data_sampler import generate_puzzle_samples
@@ -0,0 +1,54 @@
+import argparse
+import logging
+import os
+import sys
+
+from sqlalchemy import inspect, text
+
+# Add the backend root to the Python path to allow for module imports.
+# Skipped when it is already importable (e.g. PYTHONPATH set or run with `python -m`).
+BACKEND_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if BACKEND_ROOT not in sys.path:
+    sys.path.append(BACKEND_ROOT)
+
+from db.database import UPSERT_KEYS, count_duplicate_keys, get_engine
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def dedupe(engine, dry_run: bool = True) -> int:
+    """
+    One-off migration for databases created before the upsert unique keys existed.
+    For each key in UPSERT_KEYS, deletes duplicate rows keeping the newest (highest id)
+    per key; rows with a NULL key column are left alone. Returns the rows removed
+    (or that would be, with dry_run).
+    """
+    existing_tables = set(inspect(engine).get_table_names())
+    total = 0
+    with engine.begin() as conn:
+        for table, _, columns in UPSERT_KEYS:
+            if table not in existing_tables:
+                continue
+            duplicates = count_duplicate_keys(conn, table, columns)
+            logging.info(f"{table}: {duplicates} duplicate rows on ({', '.join(columns)})")
+            total += duplicates
+            if dry_run or not duplicates:
+                continue
+            cols = ', '.join(columns)
+            not_null = ' AND '.join(f"{c} IS NOT NULL" for c in columns)
+            conn.execute(text(
+                f"DELETE FROM {table} WHERE {not_null} AND id NOT IN "
+                f"(SELECT MAX(id) FROM {table} WHERE {not_null} GROUP BY {cols})"
+            ))
+            logging.info(f"{table}: deleted {duplicates} rows")
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description="Remove rows that block the upsert unique keys.")
+    parser.add_argument('--apply', action='store_true', help="delete the rows (default is a dry run)")
+    args = parser.parse_args()
+    total = dedupe(get_engine(), dry_run=not args.apply)
+    if total and not args.apply:
+        logging.info("Dry run only; re-run with --apply to delete these rows.")
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,14 @@
+import hashlib
 import logging
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from .utils import data_fetcher
 from .utils import indicators
 import pandas as pd
 import numpy as np
+from numba import njit
 
-logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 # --- Constants for Strategies ---
 # RSI thresholds
@@ -20,6 +23,51 @@ SUCCESS_THRESHOLD = 0.60
 # Momentum Surge & Trailing Stop-Loss Parameters
 TRAILING_SL_PROFIT_LOCK = 0.01
 
+# Indicator arrays shared by every strategy instance, see compute_indicators()
+INDICATOR_CACHE_SIZE = 64
+_INDICATOR_CACHE: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+
+def _cached_indicator(key, compute):
+    """Returns the cached array for `key`, computing and storing it (read-only) on a miss."""
+    arr = _INDICATOR_CACHE.get(key)
+    if arr is not None:
+        _INDICATOR_CACHE.move_to_end(key)
+        return arr
+    arr = compute()
+    arr.flags.writeable = False  # shared between strategies
+    _INDICATOR_CACHE[key] = arr
+    if len(_INDICATOR_CACHE) > INDICATOR_CACHE_SIZE:
+        _INDICATOR_CACHE.popitem(last=False)
+    return arr
+
+@njit(cache=True)
+def _first_exit(entry_idx, take_profit, stop_loss, high, low, is_long):
+    """
+    Per trade: 1 if take-profit is reached first, -1 if stop-loss is (also when both
+    fall in the same bar, the conservative reading), 0 if neither before the data ends.
+    """
+    outcome = np.zeros(len(entry_idx), dtype=np.int8)
+    n = len(high)
+    for k in range(len(entry_idx)):
+        tp = take_profit[k]
+        sl = stop_loss[k]
+        for j in range(entry_idx[k] + 1, n):
+            if is_long:
+                if low[j] <= sl:
+                    outcome[k] = -1
+                    break
+                if high[j] >= tp:
+                    outcome[k] = 1
+                    break
+            else:
+                if high[j] >= sl:
+                    outcome[k] = -1
+                    break
+                if low[j] <= tp:
+                    outcome[k] = 1
+                    break
+    return outcome
+
 class BaseStrategy(ABC):
     def __init__(self, exchange, symbol, timeframe):
         self.exchange = exchange
@@ -41,6 +89,30 @@ class BaseStrategy(ABC):
         """
         self.df = data_fetcher.fetch_ohlcv(self.exchange, self.symbol, self.timeframe)
 
+    def compute_indicators(self):
+        """
+        Returns the (MACD histogram, RSI) arrays for self.df with this strategy's
+        parameters. Arrays live in a module-level cache keyed by symbol, timeframe,
+        last bar, a digest of the whole close series and the indicator parameters, so
+        strategies running on the same market with matching parameters share one
+        computation, and repeat calls reuse it until any close changes (including
+        revised or backfilled bars, not just the last one).
+        """
+        close = np.ascontiguousarray(self.df['close'], dtype=np.float64)
+        # Both indicators depend only on close; hashing its bytes is one cheap C pass
+        digest = hashlib.blake2b(close.tobytes(), digest_size=16).digest()
+        data_key = (self.symbol, self.timeframe, self.df.index[-1], len(close), digest)
+        # Only compared against thresholds and each other: float32 halves the bytes per pass
+        macdhist = _cached_indicator(
+            data_key + ('macdhist', self.macd_fast, self.macd_slow, self.macd_signal),
+            lambda: indicators.compute_macd(self.df, self.macd_fast, self.macd_slow, self.macd_signal)[2].to_numpy(np.float32),
+        )
+        rsi = _cached_indicator(
+            data_key + ('rsi', self.rsi_period),
+            lambda: indicators.compute_rsi(self.df, self.rsi_period).to_numpy(np.float32),
+        )
+        return macdhist, rsi
+
     @abstractmethod
     def generate_signals(self):
         """
@@ -51,22 +123,25 @@ class BaseStrategy(ABC):
             return pd.DataFrame()
 
         signals = pd.DataFrame(index=self.df.index)
-        signals['signal'] = 0.0
 
         # Compute indicators with strategy-specific parameters
-        macd, macdsignal, macdhist = indicators.compute_macd(self.df, self.macd_fast, self.macd_slow, self.macd_signal)
-        rsi = indicators.compute_rsi(self.df, self.rsi_period)
-
-        # Enhanced buy/sell signal logic
-        for i in range(1, len(self.df)):
-            slope = macdhist[i] - macdhist[i-1] if i > 0 and not pd.isna(macdhist[i-1]) else 0
-
-            if rsi[i] < RSI_OVERSOLD and (macdhist[i] >= 0 or slope > 0):
-                signals.loc[self.df.index[i], 'signal'] = 1.0
-                logging.info(f"BUY signal for {self.symbol} at {self.df.index[i]}: RSI={rsi[i]:.2f}, MACD Hist={macdhist[i]:.2f}, Slope={slope:.2f}")
-            elif rsi[i] > RSI_OVERBOUGHT:
-                signals.loc[self.df.index[i], 'signal'] = -1.0
-                logging.info(f"SELL signal for {self.symbol} at {self.df.index[i]}: RSI={rsi[i]:.2f}")
+        macdhist, rsi = self.compute_indicators()
+
+        # Enhanced buy/sell signal logic, over every bar at once
+        slope = np.nan_to_num(np.diff(macdhist, prepend=np.nan), nan=0.0)
+        buy_mask = (rsi < RSI_OVERSOLD) & ((macdhist >= 0) | (slope > 0))
+        sell_mask = (rsi > RSI_OVERBOUGHT) & ~buy_mask
+        buy_mask[:1] = sell_mask[:1] = False  # the first bar has no previous histogram value
+        # -1 / 0 / 1 only, so int8 rather than float64
+        signals['signal'] = np.where(buy_mask, 1, np.where(sell_mask, -1, 0)).astype(np.int8)
+
+        # One summary line per call; per-signal detail only when DEBUG is on
+        logger.info("Generated %d buys, %d sells for %s", np.count_nonzero(buy_mask), np.count_nonzero(sell_mask), self.symbol)
+        if logger.isEnabledFor(logging.DEBUG):
+            for i in np.flatnonzero(buy_mask):
+                logger.debug("BUY signal for %s at %s: RSI=%.2f, MACD Hist=%.2f, Slope=%.2f", self.symbol, self.df.index[i], rsi[i], macdhist[i], slope[i])
+            for i in np.flatnonzero(sell_mask):
+                logger.debug("SELL signal for %s at %s: RSI=%.2f", self.symbol, self.df.index[i], rsi[i])
         return signals
 
     def backtest(self, historical_data):
@@ -80,46 +155,76 @@ class BaseStrategy(ABC):
         if signals is None or signals.empty:
             return None
 
-        # Simulate trades and calculate win rate
-        # In a real backtest, after a simulated buy at `entry_price`:
-        # entry_price = ...
-        # tp, sl = self.calculate_sl_tp(entry_price, 'buy')
-        # logging.info(f"Trade opened. Initial TP: {tp}, SL: {sl}")
-
-        # # Simulate checking for momentum surge on subsequent data points
-        # post_buy_data = historical_data.loc[historical_data.index > buy_timestamp]
-        # if indicators.detect_momentum_surge(post_buy_data):
-        #     self._handle_momentum_surge(entry_price, post_buy_data)
-
-        win_rate = 0.96 # Placeholder
+        # Each signal is simulated to its first TP/SL hit; momentum-surge exits
+        # (_handle_momentum_surge) are not modelled yet.
+        win_rate = self.backtest_vectorized()['win_rate']
         if win_rate > 0.95:
             return signals
         return None
 
-    def calculate_sl_tp(self, entry_price, side):
+    def backtest_vectorized(self):
         """
-        Calculates adaptive stop-loss and take-profit levels.
+        Backtests every signal in self.df at once: each buy (sell) enters at that bar's
+        close with the current adaptive TP/SL, and is a win if the take-profit is hit
+        before the stop-loss on a later bar. Trades still open at the end are not counted.
+        Returns a dict with 'trades', 'wins', 'losses' and 'win_rate'.
         """
-        # Adjust TP/SL based on performance
-        tp_percent_adjustment = (self.success_rate - SUCCESS_THRESHOLD) * (TP_SL_MAX_PERCENT - TP_SL_BASE_PERCENT)
+        close = np.ascontiguousarray(self.df['close'], dtype=np.float64)
+        high = np.ascontiguousarray(self.df['high'], dtype=np.float64)
+        low = np.ascontiguousarray(self.df['low'], dtype=np.float64)
+        signal = self.generate_signals()['signal'].to_numpy()
+
+        wins = losses = 0
+        for side, value in (('buy', 1), ('sell', -1)):
+            entry_idx = np.flatnonzero(signal == value)
+            if not len(entry_idx):
+                continue
+            stop_loss, take_profit = self.calculate_sl_tp(close[entry_idx], side)
+            outcome = _first_exit(entry_idx, take_profit, stop_loss, high, low, side == 'buy')
+            wins += int(np.count_nonzero(outcome == 1))
+            losses += int(np.count_nonzero(outcome == -1))
+
+        trades = wins + losses
+        return {
+            'trades': trades,
+            'wins': wins,
+            'losses': losses,
+            'win_rate': wins / trades if trades else 0.0,
+        }
+
+    @property
+    def success_rate(self):
+        return self._success_rate
+
+    @success_rate.setter
+    def success_rate(self, value):
+        self._success_rate = value
+        # Adjust TP/SL based on performance, once per update rather than per calculation
+        tp_percent_adjustment = (value - SUCCESS_THRESHOLD) * (TP_SL_MAX_PERCENT - TP_SL_BASE_PERCENT)
         tp_percent = TP_SL_BASE_PERCENT + max(0, tp_percent_adjustment)
+        # side -> (stop-loss multiplier, take-profit multiplier)
+        self._sl_tp_multipliers = {
+            'buy': (1 - tp_percent, 1 + tp_percent),
+            'sell': (1 + tp_percent, 1 - tp_percent),
+        }
 
-        if side == 'buy':
-            stop_loss = entry_price * (1 - tp_percent)
-            take_profit = entry_price * (1 + tp_percent)
-        elif side == 'sell':
-            stop_loss = entry_price * (1 + tp_percent)
-            take_profit = entry_price * (1 - tp_percent)
-        else:
+    def calculate_sl_tp(self, entry_price, side):
+        """
+        Calculates adaptive stop-loss and take-profit levels.
+        `entry_price` may also be a NumPy array of entries, priced in one go.
+        """
+        multipliers = self._sl_tp_multipliers.get(side)
+        if multipliers is None:
             return None, None
-        return stop_loss, take_profit
+        sl_mult, tp_mult = multipliers
+        return entry_price * sl_mult, entry_price * tp_mult
 
     def _handle_momentum_surge(self, entry_price: float, post_buy_data: pd.DataFrame):
         """Adjusts exit strategy upon detecting a momentum surge."""
-        logging.info("Momentum surge detected! Adjusting exit strategy.")
+        logger.info("Momentum surge detected! Adjusting exit strategy.")
         projected_peak_series = indicators.extrapolate_peak(post_buy_data)
         projected_peak = projected_peak_series.iloc[-1]
         trailing_sl_price = entry_price * (1 + TRAILING_SL_PROFIT_LOCK)
-        logging.info(f"Canceling TP. New target: {projected_peak}, Trailing SL: {trailing_sl_price}")
+        logger.info("Canceling TP. New target: %s, Trailing SL: %s", projected_peak, trailing_sl_price)
         # In a real system, you would cancel the old TP order and set new
         # limit sell and trailing stop-loss orders.
\ No newline at end of file
@@ -1,6 +1,6 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+from numba import njit
 
 def generate_synthetic_bearish_data(n_periods=100):
     """Generate synthetic OHLCV data for a bearish breakout with parabolic drop."""
@@ -24,13 +24,20 @@ def generate_synthetic_bearish_data(n_periods=100):
     return df
 
 def compute_rsi(close, period=14):
-    """Compute RSI manually."""
-    delta = close.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
+    """Compute RSI manually, with Wilder smoothing."""
+    delta = np.diff(close.to_numpy(dtype=np.float64), prepend=np.nan)
+    # Gains and losses in one frame so both are smoothed by a single ewm pass
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    # Row 0 has no previous close: NaN, so ewm starts at the first real move
+    gain[:1] = loss[:1] = np.nan
+    moves = pd.DataFrame({'gain': gain, 'loss': loss})
+    smoothed = moves.ewm(alpha=1 / period, adjust=False).mean().to_numpy()
+    # A zero average loss gives rs = inf, i.e. RSI 100
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = smoothed[:, 0] / smoothed[:, 1]
+        rsi = 100 - (100 / (1 + rs))
+    return pd.Series(rsi, index=close.index)
 
 def compute_macd(close, fast=12, slow=26, signal=9):
     """Compute MACD manually."""
@@ -41,13 +48,13 @@ def compute_macd(close, fast=12, slow=26, signal=9):
     histogram = macd_line - signal_line
     return macd_line, signal_line, histogram
 
-def parabolic_sar(high, low, af_step=0.02, af_max=0.2):
-    """Parabolic SAR implementation (from standard formula)."""
+@njit(cache=True)
+def _parabolic_sar_loop(high, low, af_step, af_max):
     length = len(high)
     sar = np.zeros(length)
     ep = np.zeros(length)
     af = np.full(length, af_step)
-    uptrend = [True] * length
+    uptrend = np.ones(length, dtype=np.bool_)
     
     # Initialize
     sar[0] = low[0]
@@ -89,6 +96,37 @@ def parabolic_sar(high, low, af_step=0.02, af_max=0.2):
     
     return sar
 
+def parabolic_sar(high, low, af_step=0.02, af_max=0.2):
+    """Parabolic SAR implementation (from standard formula), compiled with numba."""
+    # C-contiguous float64 so the kernel walks memory sequentially; a column of a
+    # frame built from a 2-D array is otherwise a strided view
+    high = np.ascontiguousarray(high, dtype=np.float64)
+    low = np.ascontiguousarray(low, dtype=np.float64)
+    return _parabolic_sar_loop(high, low, float(af_step), float(af_max))
+
+@njit(cache=True)
+def _prior_rolling_min(values, window):
+    """
+    Minimum of the previous `window` values at each bar, NaN for the first `window`
+    bars; same as pd.Series(values).rolling(window).min().shift(1) for NaN-free input.
+    Monotonic index queue, so O(n) regardless of the window length.
+    """
+    n = len(values)
+    out = np.full(n, np.nan)
+    queue = np.empty(n, dtype=np.int64)  # indices whose values increase front to back
+    head = 0
+    tail = 0
+    for i in range(n):
+        if i >= window:
+            while queue[head] < i - window:
+                head += 1
+            out[i] = values[queue[head]]
+        while tail > head and values[queue[tail - 1]] >= values[i]:
+            tail -= 1
+        queue[tail] = i
+        tail += 1
+    return out
+
 def detect_bearish_breakout(df, rsi_period=14, macd_fast=12, macd_slow=26, macd_signal=9, vol_period=20, rsi_ob=70, rsi_bb=50, vol_spike_mult=2.0):
     """Detect bearish breakout and map potential sell/short signals."""
     close = df['Close']
@@ -96,59 +134,85 @@ def detect_bearish_breakout(df, rsi_period=14, macd_fast=12, macd_slow=26, macd_
     low = df['Low']
     volume = df['Volume']
     
-    # Indicators
-    df['RSI'] = compute_rsi(close, rsi_period)
-    df['MACD'], df['MACD_Signal'], df['MACD_Hist'] = compute_macd(close, macd_fast, macd_slow, macd_signal)
-    df['SAR'] = parabolic_sar(high, low)
-    df['Vol_SMA'] = volume.rolling(vol_period).mean()
-    df['Breakout_Low'] = low.rolling(20).min().shift(1)  # Recent low for breakout detection
+    # Indicators, collected locally and attached to df in a single assign below
+    cols = {}
+    cols['RSI'] = rsi = compute_rsi(close, rsi_period)
+    macd, signal_line, macd_hist = compute_macd(close, macd_fast, macd_slow, macd_signal)
+    cols['MACD'], cols['MACD_Signal'], cols['MACD_Hist'] = macd, signal_line, macd_hist
+    cols['SAR'] = sar = pd.Series(parabolic_sar(high, low), index=df.index)
+    cols['Vol_SMA'] = vol_sma = volume.rolling(vol_period).mean()
+    # Recent low for breakout detection
+    cols['Breakout_Low'] = breakout_low = pd.Series(_prior_rolling_min(np.ascontiguousarray(low, dtype=np.float64), 20), index=df.index)
     
     # Signals
-    df['In_Breakout'] = close < df['Breakout_Low']
-    df['Vol_Spike'] = volume > df['Vol_SMA'] * vol_spike_mult
-    df['Vol_Decline'] = volume < df['Vol_SMA'] * 0.8  # Post-climax decline (optional for confirmation)
-    df['RSI_Overbought_to_Bear'] = (df['RSI'].shift(1) > rsi_ob) & (df['RSI'] < rsi_bb)  # Shift from overbought to bearish
-    df['MACD_Bearish'] = (df['MACD'].shift(1) > df['MACD_Signal'].shift(1)) & (df['MACD'] < df['MACD_Signal'])  # Crossover down
-    df['SAR_Flip'] = (df['SAR'].shift(1) > close.shift(1)) & (df['SAR'] < close)  # Wait, for bearish: flip to above (resistance)
+    cols['In_Breakout'] = close < breakout_low
+    cols['Vol_Spike'] = volume > vol_sma * vol_spike_mult
+    cols['Vol_Decline'] = volume < vol_sma * 0.8  # Post-climax decline (optional for confirmation)
+
+    # Bar-over-bar transitions: compare each bar's state with the previous bar's via
+    # offset slices of the same arrays instead of shifted copies; bar 0 has no previous.
+    n = len(df)
+    close_arr, rsi_arr, sar_arr = close.to_numpy(), rsi.to_numpy(), sar.to_numpy()
+    macd_arr, signal_arr = macd.to_numpy(), signal_line.to_numpy()
+    sar_above = sar_arr > close_arr
+    sar_below = sar_arr < close_arr
+    macd_above = macd_arr > signal_arr
+
+    rsi_ob_to_bear = np.zeros(n, dtype=bool)
+    rsi_ob_to_bear[1:] = (rsi_arr[:-1] > rsi_ob) & (rsi_arr[1:] < rsi_bb)
+    cols['RSI_Overbought_to_Bear'] = rsi_ob_to_bear  # Shift from overbought to bearish
+    macd_bearish = np.zeros(n, dtype=bool)
+    macd_bearish[1:] = macd_above[:-1] & (macd_arr[1:] < signal_arr[1:])
+    cols['MACD_Bearish'] = macd_bearish  # Crossover down
+    sar_flip = np.zeros(n, dtype=bool)
+    sar_flip[1:] = sar_above[:-1] & sar_below[1:]
+    cols['SAR_Flip'] = sar_flip  # Wait, for bearish: flip to above (resistance)
     # Correction for SAR bearish flip: From below (support) to above (resistance) during downtrend
-    df['SAR_Flip_Bear'] = (df['SAR'].shift(1) < close.shift(1)) & (df['SAR'] > close)  # Dots now above price
+    sar_flip_bear = np.zeros(n, dtype=bool)
+    sar_flip_bear[1:] = sar_below[:-1] & sar_above[1:]
+    cols['SAR_Flip_Bear'] = sar_flip_bear  # Dots now above price
     
     # Sell/Short signal: In breakout + at least 2 confirmations
-    confirmations = df['SAR_Flip_Bear'] + df['MACD_Bearish'] + df['RSI_Overbought_to_Bear'] + df['Vol_Spike']
-    df['Sell_Signal'] = df['In_Breakout'] & (confirmations >= 2)
+    # Counted as int8 in one contiguous matrix: adding bool arrays directly is a logical OR
+    conf_mat = np.stack([sar_flip_bear, macd_bearish, rsi_ob_to_bear, cols['Vol_Spike'].to_numpy()], axis=1).astype(np.int8)
+    confirmations = conf_mat.sum(axis=1, dtype=np.int8)
+    cols['Sell_Signal'] = sell_signal = cols['In_Breakout'].to_numpy() & (confirmations >= 2)
+    df = df.assign(**cols)
     
-    projected_bottom = df.loc[df['Sell_Signal'], 'Close'].mean() if df['Sell_Signal'].any() else np.nan  # Avg close at signals as 'mapped bottom'
+    projected_bottom = close[sell_signal].mean() if sell_signal.any() else np.nan  # Avg close at signals as 'mapped bottom'
     
     return df, projected_bottom
 
-# Run example
-df = generate_synthetic_bearish_data()
-df_detected, bottom_price = detect_bearish_breakout(df)
-
-print("Detected Sell/Short Signals:")
-print(df[df['Sell_Signal']][['Close', 'RSI', 'MACD_Hist', 'Volume', 'SAR']])
-
-print(f"\nMapped Bottom Price (for Short Entry): ${bottom_price:.2f}")
-
-# Plot for visualization
-fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(12, 10), sharex=True)
-ax1.plot(df.index, df['Close'], label='Close', color='blue')
-ax1.plot(df.index, df['SAR'], label='Parabolic SAR', color='orange', marker='.', linestyle='None')
-ax1.scatter(df[df['Sell_Signal']].index, df[df['Sell_Signal']]['Close'], color='red', marker='v', s=100, label='Sell Signal')
-ax1.set_title('Price and SAR')
-ax1.legend()
-
-ax2.plot(df.index, df['MACD_Hist'], label='MACD Histogram', color='green')
-ax2.axhline(0, color='black', linestyle='--')
-ax2.scatter(df[df['MACD_Bearish']].index, df[df['MACD_Bearish']]['MACD_Hist'], color='purple', marker='o', label='Bearish Cross')
-ax2.set_title('MACD Histogram & Bearish Cross')
-ax2.legend()
-
-ax3.bar(df.index, df['Volume'], alpha=0.3, label='Volume')
-ax3.plot(df.index, df['Vol_SMA'], color='red', label='Vol SMA')
-ax3.scatter(df[df['Vol_Spike']].index, df[df['Vol_Spike']]['Volume'], color='green', marker='^', label='Spike')
-ax3.set_title('Volume Analysis')
-ax3.legend()
-
-plt.tight_layout()
-plt.show()
\ No newline at end of file
+# Run example (only when executed directly, never on import)
+if __name__ == "__main__":
+    df = generate_synthetic_bearish_data()
+    df, bottom_price = detect_bearish_breakout(df)
+
+    print("Detected Sell/Short Signals:")
+    print(df[df['Sell_Signal']][['Close', 'RSI', 'MACD_Hist', 'Volume', 'SAR']])
+
+    print(f"\nMapped Bottom Price (for Short Entry): ${bottom_price:.2f}")
+
+    # Plot for visualization
+    import matplotlib.pyplot as plt
+    fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(12, 10), sharex=True)
+    ax1.plot(df.index, df['Close'], label='Close', color='blue')
+    ax1.plot(df.index, df['SAR'], label='Parabolic SAR', color='orange', marker='.', linestyle='None')
+    ax1.scatter(df[df['Sell_Signal']].index, df[df['Sell_Signal']]['Close'], color='red', marker='v', s=100, label='Sell Signal')
+    ax1.set_title('Price and SAR')
+    ax1.legend()
+
+    ax2.plot(df.index, df['MACD_Hist'], label='MACD Histogram', color='green')
+    ax2.axhline(0, color='black', linestyle='--')
+    ax2.scatter(df[df['MACD_Bearish']].index, df[df['MACD_Bearish']]['MACD_Hist'], color='purple', marker='o', label='Bearish Cross')
+    ax2.set_title('MACD Histogram & Bearish Cross')
+    ax2.legend()
+
+    ax3.bar(df.index, df['Volume'], alpha=0.3, label='Volume')
+    ax3.plot(df.index, df['Vol_SMA'], color='red', label='Vol SMA')
+    ax3.scatter(df[df['Vol_Spike']].index, df[df['Vol_Spike']]['Volume'], color='green', marker='^', label='Spike')
+    ax3.set_title('Volume Analysis')
+    ax3.legend()
+
+    plt.tight_layout()
+    plt.show()
@@ -66,8 +66,11 @@ def medium_btc_strategy(df, pos_in_range, h24_range_pct, avg_h24_vol):
     # Signals with range filters
     bullish_bias = pos_in_range > 50
     vol_confirm = h24_range_pct > avg_h24_vol * 0.8  # Above avg for entry
-    macd_bull = (macd > signal) & (macd.shift(1) <= signal.shift(1))  # Crossover up
-    rsi_neutral = 40 < rsi < 60  # Avoid extremes
+    # Crossover up: above the signal line now, at or below it on the previous bar
+    macd_arr, signal_arr = macd.to_numpy(), signal.to_numpy()
+    macd_bull = np.zeros(len(df), dtype=bool)
+    macd_bull[1:] = (macd_arr[1:] > signal_arr[1:]) & (macd_arr[:-1] <= signal_arr[:-1])
+    rsi_neutral = (rsi > 40) & (rsi < 60)  # Avoid extremes
     vol_spike = volume > vol_sma * 1.5
     
     df['Buy_Signal'] = macd_bull & rsi_neutral & vol_spike & bullish_bias & vol_confirm
@@ -80,30 +83,36 @@ def medium_btc_strategy(df, pos_in_range, h24_range_pct, avg_h24_vol):
     signals = df[df['Buy_Signal'] | df['Sell_Signal']]
     return df, signals, tp_pct
 
-# Example Run (Integrate with MEXC via CCXT)
-exchange = ccxt.mexc()  # Add keys in prod
-df = fetch_btc_data(exchange)
-pos_in_range, h24_range_pct, avg_h24_vol, current_price = compute_ranges(df)
-df, signals, tp_pct = medium_btc_strategy(df, pos_in_range, h24_range_pct, avg_h24_vol)
-
-print(f"Current BTC: ${current_price:.2f} | Pos in Yearly Range: {pos_in_range:.1f}%")
-print(f"24h Range: {h24_range_pct:.2f}% (Avg: {avg_h24_vol:.2f}%) | TP/SL: ±{tp_pct*100:.1f}%")
-print("Recent Signals:\n", signals[['timestamp', 'close', 'Buy_Signal', 'Sell_Signal']].tail())
-
 # Backtest Snippet (Add to your base.py)
-def backtest_medium(df, initial_capital=10000):
+def backtest_medium(df, tp_pct, initial_capital=10000):
+    # Plain ndarrays: per-bar .iloc reads go through pandas indexing on every access
+    buy_signal = df['Buy_Signal'].to_numpy()
+    sell_signal = df['Sell_Signal'].to_numpy()
+    close = df['close'].to_numpy()
+    sl_pct = -tp_pct
     capital = initial_capital
     position = 0
-    for i in range(1, len(df)):
-        if df['Buy_Signal'].iloc[i] and position == 0:
-            position = capital * 0.02 / df['close'].iloc[i]  # 2% risk
-            entry = df['close'].iloc[i]
+    for i in range(1, len(close)):
+        if buy_signal[i] and position == 0:
+            position = capital * 0.02 / close[i]  # 2% risk
+            entry = close[i]
         elif position > 0:
-            pnl = (df['close'].iloc[i] - entry) / entry
-            if df['Sell_Signal'].iloc[i] or pnl >= tp_pct or pnl <= sl_pct:
+            pnl = (close[i] - entry) / entry
+            if sell_signal[i] or pnl >= tp_pct or pnl <= sl_pct:
                 capital += capital * pnl * 0.02  # Scaled return
                 position = 0
     return (capital - initial_capital) / initial_capital * 100  # ROI %
 
-roi = backtest_medium(df)
-print(f"Backtested ROI: {roi:.1f}%")
\ No newline at end of file
+# Example Run (Integrate with MEXC via CCXT), only when executed directly
+if __name__ == "__main__":
+    exchange = ccxt.mexc()  # Add keys in prod
+    df = fetch_btc_data(exchange)
+    pos_in_range, h24_range_pct, avg_h24_vol, current_price = compute_ranges(df)
+    df, signals, tp_pct = medium_btc_strategy(df, pos_in_range, h24_range_pct, avg_h24_vol)
+
+    print(f"Current BTC: ${current_price:.2f} | Pos in Yearly Range: {pos_in_range:.1f}%")
+    print(f"24h Range: {h24_range_pct:.2f}% (Avg: {avg_h24_vol:.2f}%) | TP/SL: ±{tp_pct*100:.1f}%")
+    print("Recent Signals:\n", signals[['timestamp', 'close', 'Buy_Signal', 'Sell_Signal']].tail())
+
+    roi = backtest_medium(df, tp_pct)
+    print(f"Backtested ROI: {roi:.1f}%")
@@ -4,30 +4,48 @@
 # Fetches top 50 symbols, ~20 windows per symbol for diversity (1h data, 1y back)
 
 import argparse
-import ccxt
+import asyncio
+import ccxt.async_support as ccxt
 import pandas as pd
 import numpy as np
 import torch
-from concurrent.futures import ThreadPoolExecutor
+from numpy.lib.stride_tricks import sliding_window_view
 from typing import List, Dict
 
-def get_top_symbols(exchange: ccxt.Exchange, limit: int = 50) -> List[str]:
-    """Fetch top spot symbols by quote volume (USDT pairs for diversity)."""
-    markets = exchange.load_markets()
-    usdt_pairs = [s for s in markets if s.endswith('/USDT') and markets[s]['spot']]
+from config import TTL_SECONDS
+from disk_cache import load_json, dump_json
+
+FETCH_CONCURRENCY = 20  # in-flight OHLCV requests; enableRateLimit still paces them
+MAX_SAMPLES = 1000  # Cap at 1000 diverse
+
+async def get_top_symbols(exchange: ccxt.Exchange, limit: int = 50) -> List[str]:
+    """
+    Fetch top spot symbols by quote volume (USDT pairs for diversity).
+    The ranking is cached on disk for TTL_SECONDS['top_symbols'] so repeated runs
+    skip the markets and tickers round trips.
+    """
+    cache_name = f"top_symbols_{exchange.id}_{limit}.json"
+    cached = load_json(cache_name, TTL_SECONDS['top_symbols'])
+    if cached:
+        return cached
+
+    markets = await exchange.load_markets()
+    usdt_pairs = {s for s in markets if s.endswith('/USDT') and markets[s]['spot']}
     # Sort by inferred volume (fetch ticker for top; limit to 50)
-    tickers = exchange.fetch_tickers()
+    tickers = await exchange.fetch_tickers()
     sorted_pairs = sorted(
         [(s, t['quoteVolume']) for s, t in tickers.items() if s in usdt_pairs],
         key=lambda x: x[1] or 0, reverse=True
     )[:limit]
-    return [p[0] for p in sorted_pairs]  # Diverse: High/low vol mix
+    top_symbols = [p[0] for p in sorted_pairs]  # Diverse: High/low vol mix
+    dump_json(cache_name, top_symbols)
+    return top_symbols
 
-def fetch_one_history(sym: str, exchange: ccxt.Exchange, days_back: int = 365) -> pd.DataFrame:
+async def fetch_one_history(sym: str, exchange: ccxt.Exchange, days_back: int = 365) -> pd.DataFrame:
     """Fetch 1y 1h OHLCV for symbol."""
     since = int((pd.Timestamp.now(tz='UTC') - pd.Timedelta(days=days_back)).timestamp() * 1000)
     try:
-        ohlcv = exchange.fetch_ohlcv(sym, '1h', since=since, limit=1000)
+        ohlcv = await exchange.fetch_ohlcv(sym, '1h', since=since, limit=1000)
         df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
         df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
         df = df.dropna()
@@ -50,17 +68,46 @@ def fetch_one_history(sym: str, exchange: ccxt.Exchange, days_back: int = 365) -
 
 def generate_samples(histories: Dict[str, np.ndarray], seq_len: int = 60, num_per_sym: int = 20) -> torch.Tensor:
     """Window histories to (total_samples, seq_len, 4) for diversity."""
-    samples = []
-    for sym_data in histories.values():
-        if sym_data is None or len(sym_data) < seq_len:
-            continue
+    eligible = [d for d in histories.values() if d is not None and len(d) >= seq_len]
+    # Final size is known up front: allocate once and write windows in place
+    total = min(len(eligible) * num_per_sym, MAX_SAMPLES)
+    samples = np.empty((total, seq_len, 4), dtype=np.float32)
+    written = 0
+    for sym_data in eligible:
+        if written >= total:
+            break
         # Normalize embed_4 to 0-1
         sym_data[:, 3] = (sym_data[:, 3] - sym_data[:, 3].min()) / (sym_data[:, 3].max() - sym_data[:, 3].min() + 1e-8)
         sym_data[:, :3] /= 255.0  # RGB to 0-1
-        for start in np.random.choice(len(sym_data) - seq_len, num_per_sym, replace=False):
-            samples.append(sym_data[start:start + seq_len])
-    samples = np.array(samples[:1000])  # Cap at 1000 diverse
-    return torch.tensor(samples, dtype=torch.float32)  # (1000, 60, 4)
+        starts = np.random.choice(len(sym_data) - seq_len, num_per_sym, replace=False)[:total - written]
+        # (windows, 4, seq_len) strided view -> one fancy-indexed copy per symbol
+        windows = sliding_window_view(sym_data, seq_len, axis=0)
+        samples[written:written + len(starts)] = windows[starts].transpose(0, 2, 1)
+        written += len(starts)
+    return torch.from_numpy(samples)  # (1000, 60, 4), shares the array's memory
+
+async def main(args):
+    exchange = ccxt.mexc({'apiKey': args.api_key, 'secret': args.secret, 'enableRateLimit': True})
+    try:
+        symbols = await get_top_symbols(exchange, 50)  # Diverse top 50
+        print(f"Fetching {len(symbols)} symbols...")
+
+        # All requests share one event loop and connection pool instead of a thread each
+        semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+        async def fetch(sym):
+            async with semaphore:
+                return sym, await fetch_one_history(sym, exchange)
+
+        histories = dict(await asyncio.gather(*(fetch(s) for s in symbols)))
+    finally:
+        await exchange.close()
+
+    tensor = generate_samples({s: h for s, h in histories.items() if h is not None}, num_per_sym=args.num_samples // len([h for h in histories.values() if h is not None]))
+    # Every channel is normalized to 0-1, where fp16 keeps ~3 significant digits:
+    # half the file size. Readers cast back with .to(torch.float32)
+    torch.save(tensor.to(torch.float16), args.output)
+    print(f"Saved {len(tensor)} samples to {args.output}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -69,14 +116,5 @@ if __name__ == "__main__":
     parser.add_argument("--api_key", help="MEXC API key (optional for public)")
     parser.add_argument("--secret", help="MEXC secret")
     args = parser.parse_args()
-    
-    exchange = ccxt.mexc({'apiKey': args.api_key, 'secret': args.secret, 'enableRateLimit': True})
-    symbols = get_top_symbols(exchange, 50)  # Diverse top 50
-    print(f"Fetching {len(symbols)} symbols...")
-    
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        histories = dict(executor.map(lambda s: (s, fetch_one_history(s, exchange)), symbols))
-    
-    tensor = generate_samples({s: h for s, h in histories.items() if h is not None}, num_per_sym=args.num_samples // len([h for h in histories.values() if h is not None]))
-    torch.save(tensor, args.output)
-    print(f"Saved {len(tensor)} samples to {args.output}")
\ No newline at end of file
+
+    asyncio.run(main(args))
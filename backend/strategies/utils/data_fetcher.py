@@ -1,14 +1,51 @@
+import asyncio
 import logging
 import ccxt
+import ccxt.async_support as ccxt_async
 import time
 import pandas as pd
 from db.utils import store_data
+from .rolling import rolling_std
 from typing import List, Dict
-from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from datetime import datetime, timedelta
 
-logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FETCH_CONCURRENCY = 10  # in-flight history requests in fetch_multi_histories
+RATE_LIMIT_BACKOFF_START = 2  # seconds; doubled on each consecutive RateLimitExceeded
+RATE_LIMIT_BACKOFF_MAX = 30
+RATE_LIMIT_BURST = 5  # requests the shared bucket lets through back to back
+
+class TokenBucket:
+    """
+    Request pacer shared by every task of a fan-out: refills `rate` tokens per second
+    up to `capacity`, and each request takes one, waiting if the bucket is empty.
+    """
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        # Waiters queue on the lock, so they are released one refill apart
+        async with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self.tokens = 0.0
+                self.last = time.monotonic()
+            else:
+                self.tokens -= 1
+
+    def penalize(self):
+        """Drains the bucket after a rate-limit response so every task slows down, not just the one that was rejected."""
+        self.tokens = 0.0
+        self.last = time.monotonic()
 
 def fetch_symbols(exchange):
     """
@@ -58,13 +95,13 @@ def fetch_order_book(exchange, symbol, limit=20):
         print(f"Error fetching order book for {symbol}: {e}")
         return None
 
-def fetch_multi_histories(symbols: List[str], exchange: ccxt.Exchange, timeframe='1h', days_back=365) -> Dict[str, pd.DataFrame]:
+async def fetch_multi_histories(symbols: List[str], exchange: ccxt_async.Exchange, timeframe='1h', days_back=365) -> Dict[str, pd.DataFrame]:
     """
-    Fetches historical OHLCV data for multiple symbols in parallel.
+    Fetches historical OHLCV data for multiple symbols concurrently.
 
     Args:
         symbols: List of symbols to fetch data for.
-        exchange: A ccxt exchange instance.
+        exchange: A ccxt.async_support exchange instance; the caller owns and closes it.
         timeframe: The timeframe to fetch data for (e.g., '1h', '4h', '1d').
         days_back: The number of days of historical data to fetch.
 
@@ -74,40 +111,67 @@ def fetch_multi_histories(symbols: List[str], exchange: ccxt.Exchange, timeframe
     """
     histories = {}
     since = exchange.parse8601((datetime.utcnow() - timedelta(days=days_back)).isoformat())
+    sem = asyncio.Semaphore(FETCH_CONCURRENCY)
+    bucket = TokenBucket(rate=1000 / exchange.rateLimit, capacity=RATE_LIMIT_BURST)
 
-    def fetch_history(symbol):
-        logging.info(f"Fetching history for {symbol}...")
+    async def fetch_history(symbol):
+        logger.info("Fetching history for %s...", symbol)
+        backoff = RATE_LIMIT_BACKOFF_START
         for i in range(3):  # Retry up to 3 times
             try:
-                time.sleep(exchange.rateLimit / 1000)  # Respect rate limit
-                ohlcv = exchange.fetch_ohlcv(symbol, timeframe, since=since)
-                df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                df.set_index('timestamp', inplace=True)
-
-                # Calculate percentage changes
-                df['change_pct'] = df['close'].pct_change()
-                df['volume_pct'] = df['volume'].pct_change()
-                
+                async with sem:
+                    await bucket.acquire()  # Respect rate limit
+                    ohlcv = await exchange.fetch_ohlcv(symbol, timeframe, since=since)
+            except ccxt.RateLimitExceeded as e:
+                logger.warning("Rate limited fetching %s (attempt %s), backing off %ss: %s", symbol, i+1, backoff, e)
+                bucket.penalize()
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, RATE_LIMIT_BACKOFF_MAX)
+                continue
+            except (ccxt.ExchangeError, ccxt.NetworkError) as e:
+                logger.error("Error fetching %s (attempt %s): %s", symbol, i+1, e)
+                await asyncio.sleep(5)  # Wait before retrying
+                continue
+
+            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+            df.set_index('timestamp', inplace=True)
+
+            # Bar-over-bar features straight on the float64 buffers; row 0 has no previous bar
+            close = df['close'].to_numpy(dtype=np.float64)
+            volume = df['volume'].to_numpy(dtype=np.float64)
+            change_pct = np.empty_like(close)
+            volume_pct = np.empty_like(volume)
+            log_ret = np.log(close)
+            change_pct[0] = volume_pct[0] = np.nan
+            np.divide(close[1:], close[:-1], out=change_pct[1:])
+            np.divide(volume[1:], volume[:-1], out=volume_pct[1:])
+            change_pct[1:] -= 1
+            volume_pct[1:] -= 1
+            log_ret[1:] = np.diff(log_ret)  # log(c[t]) - log(c[t-1]), no ratio array
+            log_ret[0] = np.nan
+
+            df = df.assign(
+                change_pct=change_pct,
+                volume_pct=volume_pct,
+                log_ret=log_ret,
                 # Volatility (e.g., standard deviation of log returns)
-                df['log_ret'] = np.log(df['close'] / df['close'].shift(1))
-                df['volatility_pct'] = df['log_ret'].rolling(window=20).std()
-
-                # Placeholder for sentiment
-                df['sentiment_pct'] = 0.5  # Neutral sentiment
+                volatility_pct=rolling_std(log_ret, 20),
+                sentiment_pct=0.5,  # Placeholder for sentiment: neutral
+            )
 
-                df.dropna(inplace=True)
-                logging.info(f"Successfully fetched history for {symbol}.")
-                return symbol, df
-            except (ccxt.ExchangeError, ccxt.NetworkError) as e:
-                logging.error(f"Error fetching {symbol} (attempt {i+1}): {e}")
-                time.sleep(5)  # Wait before retrying
+            df.dropna(inplace=True)
+            logger.info("Successfully fetched history for %s.", symbol)
+            return symbol, df
         return symbol, None
 
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        results = executor.map(fetch_history, symbols)
+    results = await asyncio.gather(*(fetch_history(s) for s in symbols), return_exceptions=True)
 
-    for symbol, df in results:
+    for result in results:
+        if isinstance(result, BaseException):
+            logger.error("Unexpected error fetching history: %s", result)
+            continue
+        symbol, df = result
         if df is not None and not df.empty:
             histories[symbol] = df
             
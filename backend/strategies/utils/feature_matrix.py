@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from . import indicators
+from .rolling import rolling_minmax
+
+# Column order of the matrix returned by build_features
+FEATURE_COLUMNS = ('sma', 'macd_hist', 'k', 'd', 'j', 'rsi', 'willr')
+SMA_PERIOD = 20
+WILLR_PERIOD = 14
+
+def build_features(df: pd.DataFrame) -> np.ndarray:
+    """
+    Computes every indicator once over the full series into one C-contiguous float32
+    (T, len(FEATURE_COLUMNS)) matrix; walk-forward folds then take views of it rather
+    than recomputing per fold. Rows are NaN until each indicator's window has filled.
+    """
+    close = df['close'].to_numpy(dtype=np.float64)
+    high = np.ascontiguousarray(df['high'], dtype=np.float64)
+    low = np.ascontiguousarray(df['low'], dtype=np.float64)
+
+    sma = np.full(len(close), np.nan)
+    if len(close) >= SMA_PERIOD:
+        csum = np.cumsum(close)
+        sma[SMA_PERIOD - 1:] = (csum[SMA_PERIOD - 1:] - np.concatenate(([0.0], csum[:-SMA_PERIOD]))) / SMA_PERIOD
+    _, _, macd_hist = indicators.compute_macd(df)
+    k, d, j = indicators.compute_kdj(df)
+    rsi = indicators.compute_rsi(df)
+    lowest, highest = rolling_minmax(low, high, WILLR_PERIOD)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        willr = -100.0 * (highest - close) / (highest - lowest)
+
+    out = np.empty((len(close), len(FEATURE_COLUMNS)), dtype=np.float32)
+    for col, values in enumerate((sma, macd_hist, k, d, j, rsi, willr)):
+        out[:, col] = values  # casts into the float32 tile, no float64 intermediate matrix
+    return out
+
+def iter_walk_forward(X: np.ndarray, t_is: int = 160, t_oos: int = 40, step: int = 40):
+    """Yields (in-sample, out-of-sample) row slices of X per fold; both are views, not copies."""
+    for start in range(0, len(X) - t_is - t_oos + 1, step):
+        split = start + t_is
+        yield X[start:split], X[split:split + t_oos]
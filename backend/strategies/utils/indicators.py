@@ -1,38 +1,155 @@
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
-import matplotlib.pyplot as plt
+from numba import njit
+from .rolling import rolling_minmax
 from datetime import datetime, timedelta
 
+from config import MOMENTUM_THRESHOLD
+
+MOMENTUM_LOOKBACK = 20  # histogram bars the latest bar is compared against
+
+@njit(cache=True)
+def _ema(x, alpha, adjust):
+    """
+    One-pass port of pandas' ewm(alpha=alpha, adjust=adjust).mean() recurrence
+    (ignore_na=False, min_periods=0), NaN handling included.
+    """
+    n = len(x)
+    out = np.empty(n)
+    if n == 0:
+        return out
+    old_wt_factor = 1.0 - alpha
+    new_wt = 1.0 if adjust else alpha
+    weighted = x[0]
+    old_wt = 1.0
+    out[0] = weighted
+    for i in range(1, n):
+        cur = x[i]
+        observed = not np.isnan(cur)
+        if not np.isnan(weighted):
+            old_wt *= old_wt_factor
+            if observed:
+                if weighted != cur:
+                    weighted = (old_wt * weighted + new_wt * cur) / (old_wt + new_wt)
+                if adjust:
+                    old_wt += new_wt
+                else:
+                    old_wt = 1.0
+        elif observed:
+            weighted = cur
+        out[i] = weighted
+    return out
+
+def compute_macd(df: pd.DataFrame, fast=12, slow=26, signal=9):
+    """MACD line, signal line and histogram of df['close']."""
+    close = np.ascontiguousarray(df['close'], dtype=np.float64)
+    macd = _ema(close, 2.0 / (fast + 1), False) - _ema(close, 2.0 / (slow + 1), False)
+    macdsignal = _ema(macd, 2.0 / (signal + 1), False)
+    index = df.index
+    return pd.Series(macd, index=index), pd.Series(macdsignal, index=index), pd.Series(macd - macdsignal, index=index)
+
+def compute_rsi(df: pd.DataFrame, period=14) -> pd.Series:
+    """RSI of df['close'] with Wilder smoothing (0-100)."""
+    delta = df['close'].diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / period, adjust=False).mean()
+    loss = (-delta.clip(upper=0)).ewm(alpha=1 / period, adjust=False).mean()
+    return 100 - (100 / (1 + gain / loss))
+
+def compute_volume_sma(df: pd.DataFrame, period=20) -> pd.Series:
+    """Simple moving average of df['volume'] over `period` bars."""
+    return df['volume'].rolling(period).mean()
+
+def _is_surge(hist: np.ndarray, threshold: float) -> bool:
+    """Latest histogram bar above `threshold` x the mean |histogram| of the bars before it."""
+    last = hist[-1]
+    prior = hist[-MOMENTUM_LOOKBACK - 1:-1]
+    prior = prior[~np.isnan(prior)]
+    if np.isnan(last) or not len(prior):
+        return False
+    return bool(last > threshold * np.abs(prior).mean())
+
+def detect_momentum_surge(df: pd.DataFrame, hist=None, threshold=None) -> bool:
+    """
+    True if the latest MACD histogram bar is a bullish surge: larger than `threshold`
+    (default MOMENTUM_THRESHOLD) times the average histogram magnitude over the
+    previous MOMENTUM_LOOKBACK bars. Pass `hist` (e.g. BaseStrategy.compute_indicators'
+    cached histogram) to skip recomputing MACD over the whole series.
+    """
+    if threshold is None:
+        threshold = MOMENTUM_THRESHOLD
+    if hist is None:
+        hist = compute_macd(df)[2]
+    return _is_surge(np.asarray(hist, dtype=np.float64), threshold)
+
+@njit(cache=True)
+def _kdj_loop(high, low, close, fastk_period, slowk_period):
+    n = len(close)
+    k = np.full(n, np.nan)
+    d = np.full(n, np.nan)
+    lowest, highest = rolling_minmax(low, high, fastk_period)
+    # Running sum of the K values in the D window; D needs all of them present
+    k_sum = 0.0
+    k_valid = 0
+    for i in range(n):
+        price_range = highest[i] - lowest[i]
+        if price_range > 0:
+            k[i] = 100.0 * (close[i] - lowest[i]) / price_range
+            k_sum += k[i]
+            k_valid += 1
+        if i >= slowk_period and not np.isnan(k[i - slowk_period]):
+            k_sum -= k[i - slowk_period]
+            k_valid -= 1
+        if k_valid == slowk_period:
+            d[i] = k_sum / slowk_period
+    return k, d, 3.0 * k - 2.0 * d
+
+def compute_kdj(df: pd.DataFrame, fastk_period=9, slowk_period=3):
+    """
+    KDJ stochastic oscillator: K over the last `fastk_period` bars' high/low range,
+    D its `slowk_period` simple average and J = 3K - 2D. NaN until the windows fill.
+    """
+    k, d, j = _kdj_loop(
+        np.ascontiguousarray(df['high'], dtype=np.float64),
+        np.ascontiguousarray(df['low'], dtype=np.float64),
+        np.ascontiguousarray(df['close'], dtype=np.float64),
+        fastk_period, slowk_period,
+    )
+    return pd.Series(k, index=df.index), pd.Series(d, index=df.index), pd.Series(j, index=df.index)
+
 def compute_sentiment_indicator(df: pd.DataFrame, bullish_col='bullish_pct', bearish_col='bearish_pct', ema_period=5):
     """Transform sentiment to 0-100 oscillator."""
     df = df.copy()
     df['net_sentiment'] = (df[bullish_col] - df[bearish_col]) / 2 + 50  # -50 to +50 → 0-100
     df['net_sentiment'] = np.clip(df['net_sentiment'], 0, 100)
-    df['sentiment_ema'] = df['net_sentiment'].ewm(span=ema_period).mean()  # Smooth
+    df['sentiment_ema'] = _ema(df['net_sentiment'].to_numpy(dtype=np.float64), 2.0 / (ema_period + 1), True)  # Smooth
     return df
 
 def test_leading_projection(df: pd.DataFrame, price_col='price', lag_days=1):
     """Test if sentiment leads price; project next 7 days if corr >0.2."""
     df['price_change'] = df[price_col].pct_change() * 100
     df['price_change_lead'] = df['price_change'].shift(-lag_days)  # Sentiment(t) → change(t+lag)
-    corr = df['sentiment_ema'].corr(df['price_change_lead'].dropna())
+    sentiment = df['sentiment_ema'].to_numpy(dtype=np.float64)
+    lead = df['price_change_lead'].to_numpy(dtype=np.float64)
+    paired = ~(np.isnan(sentiment) | np.isnan(lead))
+    corr = np.corrcoef(sentiment[paired], lead[paired])[0, 1]
     
     if corr > 0.2:
-        # Train regression
-        valid_idx = df.dropna().index
-        X = df.loc[valid_idx, 'sentiment_ema'].values.reshape(-1, 1)
-        y = df.loc[valid_idx, price_col].values
-        model = LinearRegression().fit(X, y)
+        # Closed-form 1-feature OLS of price on sentiment, over the fully populated rows
+        valid = df.notna().all(axis=1).to_numpy()
+        x = sentiment[valid]
+        y = df[price_col].to_numpy(dtype=np.float64)[valid]
+        xm, ym = x.mean(), y.mean()
+        slope = ((x - xm) * (y - ym)).sum() / ((x - xm) ** 2).sum()
+        intercept = ym - slope * xm
         
         # Project: Assume sentiment trends (e.g., +2% daily growth)
         future_days = 7
         future_sentiment = np.linspace(
-            df['sentiment_ema'].iloc[-1], 
-            df['sentiment_ema'].iloc[-1] * 1.02**future_days, 
+            sentiment[-1], 
+            sentiment[-1] * 1.02**future_days, 
             future_days
         )
-        future_prices = model.predict(future_sentiment.reshape(-1, 1))
+        future_prices = intercept + slope * future_sentiment
         
         future_df = pd.DataFrame({
             'date': pd.date_range(df.index[-1] + timedelta(days=1), periods=future_days),
@@ -45,6 +162,9 @@ def test_leading_projection(df: pd.DataFrame, price_col='price', lag_days=1):
 
 def plot_sentiment_projection(df: pd.DataFrame, projection=None):
     """Plot price candles (simplified line) + sentiment subchart + projection."""
+    # Imported here so importing the indicators never loads matplotlib
+    import matplotlib.pyplot as plt
+
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8), sharex=True, gridspec_kw={'height_ratios': [3, 1]})
     
     # Price chart
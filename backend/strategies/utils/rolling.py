@@ -0,0 +1,69 @@
+import numpy as np
+from numba import njit
+
+# Fixed-window rolling kernels for float64 arrays. Output i covers a[i-w+1:i+1] and is
+# NaN until the window is full, like pandas rolling(w) with the default min_periods.
+
+@njit(cache=True)
+def rolling_minmax(low, high, w):
+    """
+    Rolling min of `low` and rolling max of `high` in one pass (pass the same array
+    twice for a single series). Monotonic index queues, O(n) for any window length;
+    inputs are expected NaN-free (OHLC prices).
+    """
+    n = len(low)
+    mins = np.full(n, np.nan)
+    maxs = np.full(n, np.nan)
+    low_q = np.empty(n, dtype=np.int64)
+    high_q = np.empty(n, dtype=np.int64)
+    lh = lt = hh = ht = 0
+    for i in range(n):
+        while lt > lh and low[low_q[lt - 1]] >= low[i]:
+            lt -= 1
+        low_q[lt] = i
+        lt += 1
+        if low_q[lh] <= i - w:
+            lh += 1
+        while ht > hh and high[high_q[ht - 1]] <= high[i]:
+            ht -= 1
+        high_q[ht] = i
+        ht += 1
+        if high_q[hh] <= i - w:
+            hh += 1
+        if i >= w - 1:
+            mins[i] = low[low_q[lh]]
+            maxs[i] = high[high_q[hh]]
+    return mins, maxs
+
+@njit(cache=True)
+def rolling_std(a, w):
+    """
+    Rolling sample standard deviation (ddof=1), updated with Welford's add/remove
+    steps. A window containing NaN yields NaN, as in pandas.
+    """
+    n = len(a)
+    out = np.full(n, np.nan)
+    count = 0
+    mean = 0.0
+    m2 = 0.0
+    for i in range(n):
+        x = a[i]
+        if not np.isnan(x):
+            count += 1
+            delta = x - mean
+            mean += delta / count
+            m2 += delta * (x - mean)
+        if i >= w:
+            old = a[i - w]
+            if not np.isnan(old):
+                count -= 1
+                if count == 0:
+                    mean = 0.0
+                    m2 = 0.0
+                else:
+                    delta = old - mean
+                    mean -= delta / count
+                    m2 -= delta * (old - mean)
+        if count == w and w > 1:
+            out[i] = np.sqrt(max(m2, 0.0) / (w - 1))
+    return out
@@ -2,20 +2,27 @@ import san as sanpy
 import pandas as pd
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from db.models import SocialMetric
+from db.utils import dialect_insert
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 # Configure a specific logger for this module
 logger = logging.getLogger(__name__)
 
+# Concurrent Santiment requests; kept small to stay within API rate limits
+SENTIMENT_FETCH_WORKERS = 5
+
 def fetch_top_coins(api_key: str, limit: int = 50) -> List[str]:
     """Fetch top coins by market cap from Santiment more efficiently."""
     if not api_key:
         raise ValueError("Santiment API key is required.")
     sanpy.ApiConfig.api_key = api_key
     # Fetching all projects is slow. A better way is to get top projects by a metric.
-    logger.info(f"Returning hardcoded list of top coins as sanpy discovery is unreliable.")
+    logger.info("Returning hardcoded list of top coins as sanpy discovery is unreliable.")
     # Using a hardcoded list is more reliable than sanpy's discovery methods.
     top_slugs = [
         "BTC", "ETH", "XRP", "SOL", "DOGE", "ADA", "SHIB", "AVAX", "LINK", "DOT",
@@ -31,103 +38,130 @@ def fetch_sentiment_time_series(symbols: List[str], api_key: str, days_back: int
         raise ValueError("Santiment API key is required.")
     sanpy.ApiConfig.api_key = api_key
     
-    results = {}
     from_date = (datetime.now() - timedelta(days=days_back)).strftime('%Y-%m-%d')
     to_date = datetime.now().strftime('%Y-%m-%d')
 
-    for symbol in symbols:
+    def fetch_one(symbol: str) -> Optional[pd.DataFrame]:
         try:
             # Per sanpy documentation, use san.get for a single slug with multiple metrics.
-            # We will iterate through the symbols.
             df = sanpy.get(
                 f"social_volume_total,sentiment_balance_total,sentiment_positive_total,sentiment_negative_total,sentiment_neutral_total/{symbol.lower()}",
                 from_date=from_date,
                 to_date=to_date,
                 interval="1d"
             )
-            if not df.empty:
-                df.rename(columns={
-                    'social_volume_total': 'mentions',
-                    'sentiment_positive_total': 'bullish_pct',
-                    'sentiment_negative_total': 'bearish_pct',
-                    'sentiment_neutral_total': 'neutral_pct',
-                    'sentiment_balance_total': 'net_sentiment'
-                }, inplace=True)
-                df['date'] = pd.to_datetime(df.index).date
-                results[symbol] = df
+            if df.empty:
+                return None
+            df.rename(columns={
+                'social_volume_total': 'mentions',
+                'sentiment_positive_total': 'bullish_pct',
+                'sentiment_negative_total': 'bearish_pct',
+                'sentiment_neutral_total': 'neutral_pct',
+                'sentiment_balance_total': 'net_sentiment'
+            }, inplace=True)
+            df['date'] = pd.to_datetime(df.index).date
+            return df
         except Exception as e:
-            print(f"Could not fetch sentiment for {symbol}: {e}")
-            continue
-            
-    return results
+            logger.warning("Could not fetch sentiment for %s: %s", symbol, e)
+            return None
+
+    if not symbols:
+        return {}
+    # Each sanpy call is a blocking HTTP request, so overlap them on a small thread pool
+    with ThreadPoolExecutor(max_workers=min(SENTIMENT_FETCH_WORKERS, len(symbols))) as executor:
+        frames = list(executor.map(fetch_one, symbols))
+
+    return {symbol: df for symbol, df in zip(symbols, frames) if df is not None}
+
+# Per-day metric columns of SocialMetric, as stored and as read back for trends
+METRIC_COLUMNS = ['date', 'mentions', 'bullish_pct', 'bearish_pct', 'neutral_pct', 'net_sentiment']
 
 def store_metrics(db: Session, metrics_data: Dict[str, pd.DataFrame]):
-    """Upsert daily metrics to DB."""
+    """
+    Inserts daily metrics that aren't stored yet; existing (symbol, date) rows are kept
+    as they are. One executemany, so the batch size isn't bound by SQLite's limit on
+    parameters per statement.
+    """
+    rows = []
     for symbol, df in metrics_data.items():
-        for _, row in df.iterrows():
-            # Ensure row['date'] is a datetime.date object
-            metric_date = row['date']
-            if isinstance(metric_date, pd.Timestamp):
-                metric_date = metric_date.date()
-
-            existing = db.query(SocialMetric).filter_by(symbol=symbol, date=metric_date).first()
-            if not existing:
-                metric = SocialMetric(
-                    symbol=symbol,
-                    date=metric_date,
-                    mentions=row['mentions'],
-                    bullish_pct=row['bullish_pct'],
-                    bearish_pct=row['bearish_pct'],
-                    neutral_pct=row['neutral_pct'],
-                    net_sentiment=row['net_sentiment']
-                )
-                db.add(metric)
+        for record in df[METRIC_COLUMNS].to_dict('records'):
+            # Ensure the date is a datetime.date object
+            if isinstance(record['date'], pd.Timestamp):
+                record['date'] = record['date'].date()
+            record['symbol'] = symbol
+            rows.append(record)
+
+    if not rows:
+        return
+    stmt = dialect_insert(db, SocialMetric).on_conflict_do_nothing(index_elements=['symbol', 'date'])
+    db.execute(stmt, rows)
     db.commit()
 
-def get_daily_sentiment_trend(db: Session, symbol: str, days_back: int = 7) -> Optional[Dict]:
-    """Query DB for daily counters + live (latest). Returns avg sentiment, mention growth."""
+TREND_COLUMNS = ['symbol'] + METRIC_COLUMNS
+
+def _trends_statement(symbols: List[str], days_back: int):
     end_date = datetime.now().date()
     start_date = end_date - timedelta(days=days_back)
-    metrics = db.query(SocialMetric).filter( # type: ignore
-        SocialMetric.symbol == symbol,
+    # Select plain columns rather than ORM entities: rows go straight into the
+    # DataFrame without building (and identity-mapping) a SocialMetric per row.
+    return select(*(getattr(SocialMetric, c) for c in TREND_COLUMNS)).where(
+        SocialMetric.symbol.in_(symbols),
         SocialMetric.date >= start_date
-    ).all()
-    
-    if not metrics:
-        return None
-    
-    df = pd.DataFrame([{
-        'date': m.date,
-        'mentions': m.mentions,
-        'bullish_pct': m.bullish_pct,
-        'bearish_pct': m.bearish_pct,
-        'neutral_pct': m.neutral_pct,
-        'net_sentiment': m.net_sentiment
-    } for m in metrics])
-    
-    # Daily counters: Sum/avg per day
-    daily = df.groupby('date').agg({
+    )
+
+def _trends_from_rows(rows) -> Dict[str, Dict]:
+    """Builds each symbol's daily history and live 24h summary from metric rows."""
+    if not rows:
+        return {}
+    df = pd.DataFrame.from_records(rows, columns=TREND_COLUMNS)
+    # Daily counters for every symbol in one grouped pass: Sum/avg per (symbol, day)
+    daily = df.groupby(['symbol', 'date']).agg({
         'mentions': 'sum',
         'bullish_pct': 'mean',
         'bearish_pct': 'mean',
         'neutral_pct': 'mean',
         'net_sentiment': 'mean'
     }).reset_index()
-    
-    # Live current 24h: Latest row
-    live = daily.iloc[-1].to_dict()
-    
-    # Trend: Mention growth % (current vs prev day)
-    if len(daily) > 1:
-        previous_mentions = daily.iloc[-2]['mentions']
-        if previous_mentions > 0:
-            live['mention_growth_pct'] = (live['mentions'] - previous_mentions) / previous_mentions * 100
-        else:
-            live['mention_growth_pct'] = 0  # Avoid division by zero
-    else:
-        live['mention_growth_pct'] = 0
-    
-    return {'daily_history': daily.to_dict('records'), 'live_24h': live}
+
+    # Trend: Mention growth % vs the symbol's previous day (0 on its first day, or
+    # when the previous day had no mentions, to avoid division by zero)
+    previous = daily.groupby('symbol', sort=False)['mentions'].shift(1)
+    growth = ((daily['mentions'] - previous) / previous * 100).where(previous > 0, 0.0)
+
+    trends = {}
+    for symbol, group in daily.groupby('symbol', sort=False):
+        history = group.drop(columns='symbol')
+        # Live current 24h: Latest day
+        live = history.iloc[-1].to_dict()
+        live['mention_growth_pct'] = float(growth.at[group.index[-1]])
+        trends[symbol] = {'daily_history': history.to_dict('records'), 'live_24h': live}
+    return trends
+
+def get_daily_sentiment_trends(db: Session, symbols: List[str], days_back: int = 7) -> Dict[str, Dict]:
+    """
+    Batch variant of get_daily_sentiment_trend.
+    Loads metrics for all symbols in a single query and summarizes them per symbol.
+    Symbols without data are omitted from the result.
+    """
+    if not symbols:
+        return {}
+    rows = db.execute(_trends_statement(symbols, days_back)).all()
+    return _trends_from_rows(rows)
+
+def get_daily_sentiment_trend(db: Session, symbol: str, days_back: int = 7) -> Optional[Dict]:
+    """Query DB for daily counters + live (latest). Returns avg sentiment, mention growth."""
+    return get_daily_sentiment_trends(db, [symbol], days_back).get(symbol)
+
+async def get_daily_sentiment_trends_async(db: AsyncSession, symbols: List[str], days_back: int = 7) -> Dict[str, Dict]:
+    """AsyncSession counterpart of get_daily_sentiment_trends, for the API routes."""
+    if not symbols:
+        return {}
+    result = await db.execute(_trends_statement(symbols, days_back))
+    return _trends_from_rows(result.all())
+
+async def get_daily_sentiment_trend_async(db: AsyncSession, symbol: str, days_back: int = 7) -> Optional[Dict]:
+    """AsyncSession counterpart of get_daily_sentiment_trend."""
+    return (await get_daily_sentiment_trends_async(db, [symbol], days_back)).get(symbol)
 
 # Scheduler integration (in main.py)
 def update_sentiment_job():
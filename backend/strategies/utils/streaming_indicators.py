@@ -0,0 +1,95 @@
+import math
+from collections import deque
+
+# Incremental counterparts of the indicators in indicators.py: each update() folds in
+# one new close in O(1) and returns the latest value, so a live feed appending candles
+# one at a time never recomputes over the full history. Values match the batch
+# functions on the same series (NaN until enough bars have arrived).
+
+class StreamingSMA:
+    """Simple moving average over the last `period` values (running sum)."""
+    def __init__(self, period: int):
+        self.period = period
+        self._window = deque(maxlen=period)
+        self._sum = 0.0
+
+    def update(self, x: float) -> float:
+        if len(self._window) == self.period:
+            self._sum -= self._window[0]
+        self._window.append(x)
+        self._sum += x
+        return self.value
+
+    @property
+    def value(self) -> float:
+        if len(self._window) < self.period:
+            return math.nan
+        return self._sum / self.period
+
+class StreamingEMA:
+    """Exponential moving average, same recursion as pandas ewm(adjust=False)."""
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self._value = math.nan
+
+    @classmethod
+    def from_span(cls, span: int) -> "StreamingEMA":
+        return cls(2.0 / (span + 1))
+
+    def update(self, x: float) -> float:
+        if math.isnan(self._value):
+            self._value = x
+        else:
+            self._value += self.alpha * (x - self._value)
+        return self._value
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+class StreamingRSI:
+    """RSI with Wilder smoothing of average gain/loss, as indicators.compute_rsi."""
+    def __init__(self, period: int = 14):
+        self.period = period
+        self._prev_close = math.nan
+        self._avg_gain = math.nan
+        self._avg_loss = math.nan
+
+    def update(self, close: float) -> float:
+        if not math.isnan(self._prev_close):
+            delta = close - self._prev_close
+            gain, loss = max(delta, 0.0), max(-delta, 0.0)
+            if math.isnan(self._avg_gain):
+                self._avg_gain, self._avg_loss = gain, loss
+            else:
+                self._avg_gain += (gain - self._avg_gain) / self.period
+                self._avg_loss += (loss - self._avg_loss) / self.period
+        self._prev_close = close
+        return self.value
+
+    @property
+    def value(self) -> float:
+        if math.isnan(self._avg_gain):
+            return math.nan
+        if self._avg_loss == 0:
+            return 100.0 if self._avg_gain > 0 else math.nan
+        return 100 - (100 / (1 + self._avg_gain / self._avg_loss))
+
+class StreamingMACD:
+    """MACD line, signal line and histogram, as indicators.compute_macd."""
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self._fast = StreamingEMA.from_span(fast)
+        self._slow = StreamingEMA.from_span(slow)
+        self._signal = StreamingEMA.from_span(signal)
+
+    def update(self, close: float):
+        macd = self._fast.update(close) - self._slow.update(close)
+        self._signal.update(macd)
+        return self.value
+
+    @property
+    def value(self):
+        """(macd, signal, histogram)"""
+        macd = self._fast.value - self._slow.value
+        signal = self._signal.value
+        return macd, signal, macd - signal
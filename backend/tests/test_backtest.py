@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+from strategies.short_term import ShortTermStrategy
+
+def _ohlc_frame():
+    rng = np.random.default_rng(1)
+    close = 100 + rng.normal(0, 1, 500).cumsum()
+    spread = rng.uniform(0.1, 1.5, 500)
+    return pd.DataFrame({'high': close + spread, 'low': close - spread, 'close': close})
+
+def _loop_backtest(strategy):
+    """Per-trade, per-bar reference simulation of backtest_vectorized's rules."""
+    df = strategy.df
+    wins = losses = 0
+    for i, value in enumerate(strategy.generate_signals()['signal']):
+        side = {1: 'buy', -1: 'sell'}.get(value)
+        if side is None:
+            continue
+        sl, tp = strategy.calculate_sl_tp(df['close'].iloc[i], side)
+        for j in range(i + 1, len(df)):
+            high, low = df['high'].iloc[j], df['low'].iloc[j]
+            hit_sl = low <= sl if side == 'buy' else high >= sl
+            hit_tp = high >= tp if side == 'buy' else low <= tp
+            if hit_sl:
+                losses += 1
+                break
+            if hit_tp:
+                wins += 1
+                break
+    return wins, losses
+
+def test_backtest_vectorized_matches_loop():
+    strategy = ShortTermStrategy(exchange='test', symbol='BACKTEST/USDT')
+    strategy.df = _ohlc_frame()
+    result = strategy.backtest_vectorized()
+    wins, losses = _loop_backtest(strategy)
+    assert wins + losses > 0
+    assert (result['wins'], result['losses']) == (wins, losses)
+    assert result['trades'] == wins + losses
+    assert result['win_rate'] == wins / (wins + losses)
@@ -0,0 +1,19 @@
+import numpy as np
+import pandas as pd
+from strategies.utils.feature_matrix import FEATURE_COLUMNS, build_features, iter_walk_forward
+
+def test_build_features_shape_and_dtype():
+    close = 100 + np.random.default_rng(0).normal(0, 1, 300).cumsum()
+    df = pd.DataFrame({'high': close + 1, 'low': close - 1, 'close': close})
+    X = build_features(df)
+    assert X.shape == (len(df), len(FEATURE_COLUMNS))
+    assert X.dtype == np.float32
+    assert not np.isnan(X[-1]).any()
+
+def test_walk_forward_folds_are_views():
+    X = np.arange(400 * 7, dtype=np.float32).reshape(400, 7)
+    folds = list(iter_walk_forward(X, t_is=160, t_oos=40, step=40))
+    assert len(folds) == 6
+    for in_sample, out_of_sample in folds:
+        assert in_sample.shape == (160, 7) and out_of_sample.shape == (40, 7)
+        assert np.shares_memory(in_sample, X) and np.shares_memory(out_of_sample, X)
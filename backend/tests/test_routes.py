@@ -0,0 +1,46 @@
+import asyncio
+import datetime
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from api.routes import router, get_db
+from db.models import Base, SocialMetric
+
+def _client_with_metric():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_factory() as db:
+            db.add(SocialMetric(
+                symbol='BTC', date=datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0),
+                mentions=120.0, bullish_pct=55.0, bearish_pct=25.0, neutral_pct=20.0, net_sentiment=30.0,
+            ))
+            await db.commit()
+    asyncio.run(setup())
+
+    async def override_get_db():
+        async with session_factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
+
+def test_symbol_sentiment_serializes_dates():
+    client = _client_with_metric()
+    response = client.get("/api/sentiment/btc")
+    assert response.status_code == 200
+    body = response.json()
+    assert body['live_24h']['mentions'] == 120.0
+    assert isinstance(body['daily_history'][0]['date'], str)
+
+    # Same payload again is answered from the ETag
+    cached = client.get("/api/sentiment/btc", headers={'If-None-Match': response.headers['etag']})
+    assert cached.status_code == 304
@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+from strategies.utils import indicators
+from strategies.utils.streaming_indicators import StreamingSMA, StreamingRSI, StreamingMACD
+
+def _closes():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({'close': 100 + rng.normal(0, 1, 200).cumsum()})
+
+def test_streaming_sma_matches_rolling_mean():
+    df = _closes()
+    sma = StreamingSMA(20)
+    streamed = [sma.update(x) for x in df['close']]
+    np.testing.assert_allclose(streamed, df['close'].rolling(20).mean(), equal_nan=True)
+
+def test_streaming_rsi_matches_batch():
+    df = _closes()
+    rsi = StreamingRSI(14)
+    streamed = [rsi.update(x) for x in df['close']]
+    np.testing.assert_allclose(streamed, indicators.compute_rsi(df, 14), equal_nan=True)
+
+def test_streaming_macd_matches_batch():
+    df = _closes()
+    macd = StreamingMACD(12, 26, 9)
+    streamed = np.array([macd.update(x) for x in df['close']])
+    for column, expected in zip(streamed.T, indicators.compute_macd(df, 12, 26, 9)):
+        np.testing.assert_allclose(column, expected)